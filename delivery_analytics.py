@@ -0,0 +1,105 @@
+import time
+
+def timed_call(func, *args, **kwargs):
+    """Menjalankan func dan mengembalikan (hasil, detik); bisa dikirim ke process pool.
+
+    Metrik yang dicatat di proses pool tidak terlihat di proses utama, jadi pemanggil
+    mencatat durasi yang dikembalikan dengan metrics.observe.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def is_consolidated(key):
+    return key == "multi_drop" or key.startswith("multi_drop:")
+
+def route_stats(key, value, solve_time=None):
+    """Statistik satu rute tersimpan: jarak, waktu, batas bawah MST, dan gap optimalitas.
+
+    Bobot MST adalah batas bawah panjang tur yang melewati semua titik, sehingga
+    gap = (jarak - MST) / MST membatasi seberapa jauh tur dari optimal. Jika MST dihitung
+    dari sisi kandidat, bobotnya bisa sedikit di atas MST sebenarnya.
+    """
+    points, route, total_distance, (segment_distances, segment_times), *rest = value
+    stats = {
+        "key": key,
+        "stops": len(route) - 1,
+        "distance": float(total_distance),
+        "time": float(sum(segment_times)),
+        "lower_bound": None,
+        "gap": None,
+        "solve_time": solve_time,
+    }
+    if rest and rest[0] is not None:
+        lower_bound = float(sum(weight for _, _, weight in rest[0]))
+        stats["lower_bound"] = lower_bound
+        if lower_bound > 0:
+            stats["gap"] = (stats["distance"] - lower_bound) / lower_bound
+    return stats
+
+def _total_solve_time(stats):
+    """Jumlah waktu hitung yang diketahui, atau None jika tidak ada sama sekali."""
+    times = [s["solve_time"] for s in stats if s["solve_time"] is not None]
+    return sum(times) if times else None
+
+def route_analytics(routes, solve_times=None, order_ids=None):
+    """Menghitung analitik dari rute tersimpan (controller.routes) tanpa menghitung ulang rute.
+
+    Total gabungan memakai rute per dapur ("multi_drop:<dapur>") jika ada, selain itu
+    rute "multi_drop". `order_ids` adalah pesanan yang dilayani rute gabungan (default:
+    semua rute per pesanan); penghematan hanya dihitung jika setiap pesanan itu punya
+    rute per pesanan. Mengembalikan dict berisi "routes" (key -> statistik) dan "summary".
+    """
+    solve_times = solve_times or {}
+    stats = {key: route_stats(key, value, solve_times.get(key)) for key, value in routes.items()}
+    if order_ids is None:
+        order_ids = [key for key in stats if not is_consolidated(key)]
+    per_order = [stats[i] for i in order_ids if i in stats]
+    all_routed = len(per_order) == len(order_ids)
+    consolidated = [s for key, s in stats.items() if key.startswith("multi_drop:")]
+    if not consolidated and "multi_drop" in stats:
+        consolidated = [stats["multi_drop"]]
+
+    summary = {
+        "orders_routed": len(per_order),
+        "per_order_distance": sum(s["distance"] for s in per_order),
+        "per_order_time": sum(s["time"] for s in per_order),
+        "consolidated_distance": None,
+        "consolidated_time": None,
+        "lower_bound": None,
+        "gap": None,
+        "saved_distance": None,
+        "saved_time": None,
+        "saved_ratio": None,
+        "per_order_solve_time": _total_solve_time(per_order),
+        "consolidated_solve_time": _total_solve_time(consolidated),
+        "solve_time": _total_solve_time(stats.values()),
+    }
+    if consolidated:
+        summary["consolidated_distance"] = sum(s["distance"] for s in consolidated)
+        summary["consolidated_time"] = sum(s["time"] for s in consolidated)
+        if all(s["lower_bound"] is not None for s in consolidated):
+            summary["lower_bound"] = sum(s["lower_bound"] for s in consolidated)
+            if summary["lower_bound"] > 0:
+                summary["gap"] = (summary["consolidated_distance"] - summary["lower_bound"]) / summary["lower_bound"]
+        if per_order and all_routed:
+            summary["saved_distance"] = summary["per_order_distance"] - summary["consolidated_distance"]
+            summary["saved_time"] = summary["per_order_time"] - summary["consolidated_time"]
+            if summary["per_order_distance"] > 0:
+                summary["saved_ratio"] = summary["saved_distance"] / summary["per_order_distance"]
+    return {"routes": stats, "summary": summary}
+
+def format_summary(summary):
+    """Ringkasan analitik satu baris untuk label total di UI."""
+    parts = []
+    if summary["orders_routed"]:
+        parts.append(f"Per pesanan = {summary['per_order_distance']:.2f} km / {summary['per_order_time']:.2f} menit")
+    if summary["consolidated_distance"] is not None:
+        parts.append(f"Gabungan = {summary['consolidated_distance']:.2f} km / {summary['consolidated_time']:.2f} menit")
+    if summary["saved_ratio"] is not None:
+        parts.append(f"Hemat = {summary['saved_distance']:.2f} km ({summary['saved_ratio']:.0%})")
+    if summary["gap"] is not None:
+        parts.append(f"Gap MST = {summary['gap']:.0%}")
+    if summary["solve_time"] is not None:
+        parts.append(f"Waktu hitung = {summary['solve_time']:.2f} s")
+    return ", ".join(parts)
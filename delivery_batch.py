@@ -0,0 +1,118 @@
+"""Perencanaan rute tanpa GUI: membaca pesanan dari CSV/JSON dan menulis hasil ke folder.
+
+Contoh:
+    python delivery_batch.py --orders pesanan.csv --depot-name "Dapur Pusat" \\
+        --depot-address "Jl. Siliwangi No. 1" --output hasil/
+
+Dengan --point-set NAMA, matriks jarak/waktu untuk dapur + semua titik pesanan disimpan
+sekali di folder matrices/ (atau dipakai ulang jika sudah ada) untuk run berikutnya.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+from delivery_controller import DeliveryController
+
+def read_depot(path):
+    """Membaca definisi dapur dari file JSON berisi 'name' dan 'address'."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["name"], data["address"]
+
+def run_batch(orders_path, depot_name, depot_address, output_dir, multi_drop=True, maps=True, point_set=None):
+    """Menjalankan geocoding, perhitungan rute, peta, dan ekspor tanpa efek samping GUI/browser.
+
+    Pesanan dibaca dan divalidasi lewat DeliveryController.import_orders (CSV, JSON, atau
+    JSON Lines); baris tidak valid dilewati dan dicatat sebagai error. Mengembalikan dict
+    ringkasan berisi rute per pesanan, rute multi-drop, dan daftar error.
+    """
+    controller = DeliveryController(output_dir=output_dir, open_browser=False)
+    summary = {"orders": [], "multi_drop": None, "errors": []}
+
+    success, message = controller.set_depot(depot_name, depot_address)
+    if not success:
+        summary["errors"].append({"id": "depot", "error": message})
+        return summary
+
+    success, message, errors = controller.import_orders(orders_path, skip_invalid=True)
+    if not success:
+        summary["errors"].append({"id": "orders", "error": message})
+    for i, messages in sorted(errors.items()):
+        summary["errors"].append({"id": f"baris {i + 1}", "error": "; ".join(messages)})
+
+    if point_set:
+        if controller.matrix_store.exists(point_set):
+            success, message = controller.use_point_set(point_set)
+        else:
+            success, message = controller.build_point_set(point_set)
+        if not success:
+            summary["errors"].append({"id": "point_set", "error": message})
+
+    for order in controller.orders:
+        points, route, results, error = controller.calculate_route_for_order(order)
+        if error:
+            summary["errors"].append({"id": order["id"], "error": error})
+            continue
+        total_distance, segment_distances, segment_times = results
+        map_file = controller.generate_map_for_order(order, points, route, segment_distances, segment_times) if maps else None
+        summary["orders"].append({
+            "id": order["id"],
+            "route": [points[i]["name"] for i in route],
+            "distance_km": float(total_distance),
+            "time_min": float(sum(segment_times)),
+            "map": map_file,
+        })
+
+    if multi_drop and controller.orders:
+        points, route, results, mst_edges, error = controller.calculate_multi_drop_route()
+        if error:
+            summary["errors"].append({"id": "multi_drop", "error": error})
+        else:
+            total_distance, segment_distances, segment_times = results
+            map_file = controller.generate_map_for_multi_drop(points, route, segment_distances, segment_times, mst_edges) if maps else None
+            summary["multi_drop"] = {
+                "route": [points[i]["name"] for i in route],
+                "distance_km": float(total_distance),
+                "time_min": float(sum(segment_times)),
+                "map": map_file,
+            }
+
+    success, summary["export"] = controller.export_to_csv()
+    if not success:
+        summary["errors"].append({"id": "export", "error": summary["export"]})
+    with open(controller.output_path("routes.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    logging.info(f"Perencanaan batch selesai: {len(summary['orders'])} rute, {len(summary['errors'])} error")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perencanaan rute pengiriman tanpa GUI.")
+    parser.add_argument("--orders", required=True, help="File pesanan (.csv atau .json)")
+    parser.add_argument("--depot", help="File JSON dapur berisi 'name' dan 'address'")
+    parser.add_argument("--depot-name", help="Nama dapur")
+    parser.add_argument("--depot-address", help="Alamat dapur")
+    parser.add_argument("--output", default="output", help="Folder keluaran (default: output)")
+    parser.add_argument("--no-multi-drop", action="store_true", help="Lewati rute multi-drop")
+    parser.add_argument("--no-maps", action="store_true", help="Jangan membuat file peta HTML")
+    parser.add_argument("--point-set", help="Nama matriks titik tersimpan (dibuat jika belum ada)")
+    args = parser.parse_args(argv)
+
+    if args.depot:
+        depot_name, depot_address = read_depot(args.depot)
+    else:
+        depot_name, depot_address = args.depot_name, args.depot_address
+    if not depot_name or not depot_address:
+        parser.error("Dapur harus diberikan lewat --depot atau --depot-name dan --depot-address.")
+
+    summary = run_batch(args.orders, depot_name, depot_address, args.output,
+                        multi_drop=not args.no_multi_drop, maps=not args.no_maps,
+                        point_set=args.point_set)
+    for error in summary["errors"]:
+        print(f"Error {error['id']}: {error['error']}", file=sys.stderr)
+    print(f"{len(summary['orders'])} rute ditulis ke {os.path.abspath(args.output)}")
+    return 1 if summary["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Benchmark tahapan perhitungan rute dengan data sintetis di wilayah Cirebon.
+
+Contoh:
+    python delivery_bench.py --sizes 10 100 1000 --output bench.json
+    python delivery_bench.py --sizes 10 100 --compare bench.json
+    python delivery_bench.py --sizes 10 100 --memory
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import delivery_models as models
+from delivery_controller import DeliveryController
+from delivery_geocode import GeocodeCache
+
+DEFAULT_SIZES = [10, 100, 1000]
+# Batas ukuran per tahap; di atas batas ini tahap dilewati (matriks geodesik O(n^2),
+# OR-Tools dengan satu kendaraan tidak praktis untuk ribuan titik).
+DEFAULT_LIMITS = {"matrix": 500, "mst": 500, "solve": 200, "map": 500}
+REGRESSION_THRESHOLD = 0.2
+# Anggaran waktu import titik masuk aplikasi (ms); modul berat harus dimuat malas.
+IMPORT_BUDGET_MS = 250
+# Modul yang dimuat malas oleh delivery_models/controller; diimpor sebelum pengukuran
+# agar biaya import tidak masuk ke durasi tahap pertama yang memakainya.
+WARMUP_MODULES = ["numpy", "geopy.distance", "ortools.constraint_solver.pywrapcp",
+                  "folium", "folium.plugins"]
+
+def generate_points(n, seed=0, bounds=models.CIREBON_BOUNDS):
+    """Membuat n titik acak yang dapat direproduksi di dalam CIREBON_BOUNDS."""
+    rng = random.Random(seed)
+    return [{"name": f"Titik {i}",
+             "coords": (round(rng.uniform(bounds["lat_min"], bounds["lat_max"]), 6),
+                        round(rng.uniform(bounds["lon_min"], bounds["lon_max"]), 6))}
+            for i in range(n)]
+
+def generate_orders(points, seed=0):
+    """Membuat pesanan sintetis: titik 0 adalah dapur, sisanya pelanggan/tujuan."""
+    rng = random.Random(seed)
+    orders = []
+    for i, point in enumerate(points[1:], start=1):
+        destination = points[rng.randrange(1, len(points))] if rng.random() < 0.3 else point
+        orders.append({
+            "id": f"bench-{i:05d}",
+            "courier": f"Kurir {i % 5}",
+            "customer": point["name"],
+            "customer_coords": point["coords"],
+            "destination": destination["name"],
+            "destination_coords": destination["coords"],
+            "order": f"Menu {rng.randrange(1, 20)}",
+            "price": float(rng.randrange(10, 200) * 1000),
+            "customer_address": f"Alamat {point['name']}",
+            "destination_address": f"Alamat {destination['name']}",
+        })
+    return orders
+
+def warm_up(modules=WARMUP_MODULES):
+    """Mengimpor modul berat sekali sebelum benchmark dimulai."""
+    for name in modules:
+        importlib.import_module(name)
+
+def measure(func, *args, memory=False, **kwargs):
+    """Menjalankan func dan mengembalikan (hasil, durasi detik, puncak memori byte atau None).
+
+    Puncak memori hanya diukur jika `memory` benar, pada pemanggilan kedua: tracemalloc
+    memperlambat setiap alokasi, jadi durasi diambil dari pemanggilan tanpa tracemalloc.
+    Hasil yang dikembalikan berasal dari pemanggilan pertama.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    if not memory:
+        return result, elapsed, None
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def bench_size(n, seed, limits, solve_time_limit, workdir, memory=False):
+    points = generate_points(n, seed)
+    orders = generate_orders(points, seed)
+    controller = DeliveryController(output_dir=workdir, open_browser=False)
+    controller.geocache = GeocodeCache({f"{o['customer_address']}, Cirebon, Indonesia": o["customer_coords"] for o in orders})
+    controller.save_cache = lambda: None
+    controller.depot = points[0]
+    controller.points = points[1:]
+    controller.orders = orders
+
+    stages = {}
+
+    def record(stage, func, *args, **kwargs):
+        result, elapsed, peak = measure(func, *args, memory=memory, **kwargs)
+        stages[stage] = {"seconds": elapsed}
+        if peak is not None:
+            stages[stage]["peak_bytes"] = peak
+        return result
+
+    def skip(stage, limit_key):
+        stages[stage] = {"skipped": f"n > {limits[limit_key]}"}
+
+    record("geocode_cache", lambda: [controller.geocode_address(o["customer_address"]) for o in orders])
+
+    quality = {}
+    distance_matrix = mst_weight = route = None
+    if n <= limits["matrix"]:
+        distance_matrix = record("matrix", models.create_distance_matrix, points)
+    else:
+        skip("matrix", "matrix")
+
+    if distance_matrix is not None and n <= limits["mst"]:
+        _, mst_weight = record("mst", models.kruskal_mst, points, distance_matrix)
+        quality["mst_km"] = float(mst_weight)
+    else:
+        skip("mst", "mst")
+
+    if distance_matrix is not None and n <= limits["solve"]:
+        route, total_distance, segments, mst_edges = record(
+            "solve", models.find_multi_drop_route, points, distance_matrix,
+            max_stops=n, time_limit=solve_time_limit)
+        if route is not None:
+            quality["tour_km"] = float(total_distance)
+            quality["tour_min"] = float(sum(segments[1]))
+            if mst_weight:
+                quality["tour_to_mst"] = float(total_distance / mst_weight)
+            controller.routes["multi_drop"] = (points, route, total_distance, segments, mst_edges)
+    else:
+        skip("solve", "solve")
+
+    if route is not None and n <= limits["map"]:
+        record("map", controller.generate_map_for_multi_drop, points, route, segments[0], segments[1], mst_edges)
+    else:
+        skip("map", "map")
+
+    success, message = record("export", controller.export_to_csv, os.path.join(workdir, f"orders_{n}.csv"))
+    if not success:
+        raise RuntimeError(message)
+    return {"size": n, "seed": seed, "stages": stages, "quality": quality}
+
+def measure_import_time(module="delivery_ui"):
+    """Mengukur waktu import kumulatif modul (ms) di proses Python baru dengan -X importtime."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"Gagal mengukur import {module}: {proc.stderr[-500:]}")
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Membandingkan durasi tiap tahap dengan hasil sebelumnya; mengembalikan daftar regresi."""
+    previous = {r["size"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result["size"])
+        if not old:
+            continue
+        for stage, data in result["stages"].items():
+            old_seconds = old["stages"].get(stage, {}).get("seconds")
+            if "seconds" not in data or not old_seconds:
+                continue
+            change = (data["seconds"] - old_seconds) / old_seconds
+            if change > threshold:
+                regressions.append({"size": result["size"], "stage": stage,
+                                    "before": old_seconds, "after": data["seconds"], "change": change})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark perhitungan rute pengiriman.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Jumlah titik (10 - 10000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--solve-time-limit", type=int, default=10, help="Batas waktu OR-Tools (detik)")
+    for stage, limit in DEFAULT_LIMITS.items():
+        parser.add_argument(f"--{stage}-max", type=int, default=limit, help=f"Ukuran maksimum tahap {stage}")
+    parser.add_argument("--output", default="bench_results.json", help="File hasil JSON")
+    parser.add_argument("--compare", help="File hasil sebelumnya untuk deteksi regresi")
+    parser.add_argument("--memory", action="store_true",
+                        help="Ukur juga puncak memori (setiap tahap dijalankan dua kali)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Kenaikan durasi relatif yang dianggap regresi (default 0.2)")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS,
+                        help="Batas waktu import delivery_ui dalam ms (default 250)")
+    args = parser.parse_args(argv)
+    limits = {stage: getattr(args, f"{stage}_max") for stage in DEFAULT_LIMITS}
+    warm_up()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            result = bench_size(n, args.seed, limits, args.solve_time_limit, workdir, args.memory)
+            results.append(result)
+            timings = ", ".join(f"{stage}={data['seconds']:.3f}s" for stage, data in result["stages"].items()
+                                if "seconds" in data)
+            print(f"n={n}: {timings}")
+
+    import_ms = measure_import_time()
+    print(f"import delivery_ui: {import_ms:.1f} ms (anggaran {args.import_budget:.0f} ms)")
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "platform": platform.platform(), "import_ms": import_ms,
+              "import_budget_ms": args.import_budget, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan ke {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESI n={r['size']} {r['stage']}: {r['before']:.3f}s -> {r['after']:.3f}s (+{r['change']:.0%})")
+        if regressions:
+            return 1
+    if import_ms > args.import_budget:
+        print(f"REGRESI import delivery_ui: {import_ms:.1f} ms melebihi anggaran {args.import_budget:.0f} ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    sys.exit(main())
@@ -1,54 +1,396 @@
-import folium
 import webbrowser
-from folium.plugins import PolyLineTextPath
-from geopy.geocoders import Nominatim
 import delivery_models as models
+from delivery_analytics import route_analytics, timed_call
+from delivery_export import export_rows, iter_export_rows
+from delivery_geocode import GEOCACHE_FILE, GeocodeCache
+from delivery_metrics import metrics
+from delivery_state import SESSION_FILE, SessionStore, matrix_key
+from delivery_spatial import SpatialIndex, candidate_edges
 import uuid
-import json
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
 import os
 import logging
+import queue
+import threading
+import time
 
-logging.basicConfig(level=logging.DEBUG, filename="delivery.log", filemode="w",
+logging.basicConfig(level=logging.DEBUG, filename="delivery.log", filemode="a",
                     format="%(asctime)s - %(levelname)s - %(message)s")
 
+ROAD_NETWORK_DIR = "roadnet"
+# Hasil geocode yang berjarak kurang dari ini dari titik yang sudah ada dianggap lokasi yang sama.
+DEDUP_RADIUS_KM = 0.015
+# Di atas jumlah titik ini, Kruskal hanya memeriksa sisi ke tetangga terdekat.
+CANDIDATE_EDGE_MIN_POINTS = 200
+CANDIDATE_EDGE_K = 8
+# Jumlah pasangan matriks jarak/waktu yang disimpan di memori (LRU).
+MATRIX_CACHE_SIZE = 32
+DEPOT_COLORS = ["red", "blue", "green", "purple", "orange", "darkred", "cadetblue", "darkgreen"]
+# Selang (detik) pemeriksaan tanda batal dan antrean progres solver multi-dapur.
+SOLVE_POLL_SECONDS = 0.1
+
+# Pandangan konsisten atas state controller pada satu versi. Daftar di dalamnya tidak
+# pernah diubah di tempat (penulis membuat salinan lalu menggantinya), routes disalin.
+StateSnapshot = namedtuple("StateSnapshot", "version depots points locations orders order_depots routes")
+
+class _PolledEvent:
+    """Tanda batal antar proses yang hanya ditanyakan ke Manager paling sering tiap SOLVE_POLL_SECONDS."""
+    def __init__(self, event):
+        self.event = event
+        self.checked = 0.0
+        self.value = False
+
+    def is_set(self):
+        now = time.monotonic()
+        if not self.value and now - self.checked >= SOLVE_POLL_SECONDS:
+            self.checked = now
+            self.value = self.event.is_set()
+        return self.value
+
+def _solve_depot_route(depot_idx, points, distance_matrix, time_matrix, edges, time_limit, cancel, updates):
+    """Worker proses untuk rute satu dapur; rute yang membaik dikirim ke `updates` (Manager Queue)."""
+    on_solution = None
+    if updates is not None:
+        def on_solution(*best):
+            updates.put((depot_idx, best))
+    return timed_call(models.find_multi_drop_route, points, distance_matrix, max_stops=len(points),
+                      time_matrix=time_matrix, time_limit=time_limit, candidate_edges=edges,
+                      on_solution=on_solution, cancel_event=_PolledEvent(cancel))
+
 class DeliveryController:
-    def __init__(self):
-        self.depot = None
+    def __init__(self, output_dir=".", open_browser=True, shared=None):
+        """`shared`: controller lain yang cache geocode, jaringan jalan, profil kecepatan,
+        dan matriks titiknya dipakai bersama, sehingga tidak ada file yang dibaca ulang."""
+        self.output_dir = output_dir
+        self.open_browser = open_browser
+        self.depots = []
+        self.order_depots = {}
         self.points = []
+        self.locations = {}
         self.orders = []
-        self.geolocator = Nominatim(user_agent="delivery_app_cirebon")
-        self.geocache = self.load_cache()
+        self._geolocator = shared.geolocator if shared else None
+        self.geocache = shared.geocache if shared else self.load_cache()
         self.routes = {}
+        self.solve_times = {}
+        self.solve_cancels = set()
+        # Melindungi depots/points/locations/orders/order_depots/routes dan indeks spasial.
+        # Penulis memegang lock hanya saat menukar state; geocode, solve, dan render di luar lock.
+        self._state_lock = threading.RLock()
+        self.version = 0
+        # Perubahan sesi diantrekan di bawah _state_lock (urutan sama dengan urutan perubahan
+        # state) lalu ditulis di luar lock oleh flush_saves; _save_lock menjaga urutan tulis.
+        self._pending_saves = deque()
+        self._save_lock = threading.Lock()
+        self.road_network = shared.road_network if shared else self.load_road_network()
+        self._matrix_store = None
+        self.point_matrix = shared.point_matrix if shared else None
+        self._speed_profile = shared.speed_profile if shared else None
+        self.departure_hour = None
+        self.matrix_cache = OrderedDict()
+        self._matrix_lock = threading.Lock()
+        self.session = None
+        self.spatial_index = SpatialIndex()
+
+    # folium, geopy, numpy, dan ortools baru diimpor saat pertama kali dibutuhkan
+    # agar jendela aplikasi cepat muncul.
+    @property
+    def geolocator(self):
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+            self._geolocator = Nominatim(user_agent="delivery_app_cirebon")
+        return self._geolocator
+
+    @geolocator.setter
+    def geolocator(self, value):
+        self._geolocator = value
+
+    @property
+    def speed_profile(self):
+        if self._speed_profile is None:
+            from delivery_speed import SpeedProfile
+            self._speed_profile = SpeedProfile.load()
+        return self._speed_profile
+
+    @speed_profile.setter
+    def speed_profile(self, value):
+        self._speed_profile = value
+
+    @property
+    def depot(self):
+        """Dapur utama (indeks 0); dapur tambahan ada di self.depots."""
+        return self.depots[0] if self.depots else None
+
+    @depot.setter
+    def depot(self, value):
+        with self._state_lock:
+            self.depots = [value] + self.depots[1:] if value is not None else []
+            self.version += 1
+
+    def snapshot(self):
+        """Mengambil state saat ini sebagai StateSnapshot tanpa menahan lock setelahnya."""
+        with self._state_lock:
+            return StateSnapshot(self.version, self.depots, self.points, self.locations,
+                                 self.orders, self.order_depots, dict(self.routes))
+
+    def store_route(self, key, value, solve_time=None):
+        """Menyimpan hasil rute dan waktu hitungnya (dipanggil dari thread mana pun)."""
+        with self._state_lock:
+            self.routes[key] = value
+            if solve_time is not None:
+                self.solve_times[key] = solve_time
+            self.version += 1
+            self.queue_save("save_route", key, value, solve_time)
+        self.flush_saves()
+
+    def drop_routes(self, keys):
+        """Menghapus rute tersimpan (memori dan sesi), mis. rute dapur yang tidak lagi dipakai."""
+        with self._state_lock:
+            keys = [key for key in keys if key in self.routes]
+            if not keys:
+                return
+            for key in keys:
+                del self.routes[key]
+                self.solve_times.pop(key, None)
+            self.version += 1
+            self.queue_save("delete_routes", keys)
+        self.flush_saves()
+
+    @property
+    def matrix_store(self):
+        if self._matrix_store is None:
+            from delivery_matrix_store import MatrixStore
+            self._matrix_store = MatrixStore()
+        return self._matrix_store
+
+    def open_session(self, path=SESSION_FILE):
+        """Membuka file sesi; state tersimpan dimuat, lalu setiap perubahan disimpan otomatis."""
+        try:
+            self.session = SessionStore(path)
+            state = self.session.load()
+        except Exception as e:
+            logging.error(f"Gagal membuka sesi {path}: {str(e)}")
+            self.session = None
+            return False, f"Gagal membuka sesi: {str(e)}"
+        with self._state_lock:
+            self.depots = state["depots"]
+            self.points = state["points"]
+            self.orders = state["orders"]
+            self.order_depots = state["order_depots"]
+            self.routes = state["routes"]
+            self.solve_times = state["solve_times"]
+            self.rebuild_locations()
+            self.rebuild_spatial_index()
+            self.version += 1
+        return True, f"Sesi dimuat: {len(self.orders)} pesanan, {len(self.routes)} rute."
+
+    def rebuild_locations(self):
+        """Menyusun ulang indeks lokasi titik dan daftar nama singgahan dari pesanan."""
+        self.locations = {models.location_key(p["coords"]): i for i, p in enumerate(self.points)}
+        for point in self.points:
+            point["stops"] = []
+        for order in self.orders:
+            for name, coords in ((order["customer"], order["customer_coords"]),
+                                 (order["destination"], order["destination_coords"])):
+                i = self.locations.get(models.location_key(coords))
+                if i is not None and name not in self.points[i]["stops"]:
+                    self.points[i]["stops"].append(name)
+
+    def intern_point(self, points, locations, name, coords):
+        """Memetakan singgahan `name` ke titik rute berdasarkan koordinat terkuantisasi.
+
+        Singgahan di lokasi yang sama berbagi satu titik. Singgahan di lokasi dapur tetap
+        menjadi titik sendiri: rute multi-drop dan multi-dapur hanya berangkat dari satu
+        dapur, jadi singgahan di dapur lain tidak boleh hilang dari rute. Mengembalikan
+        (koordinat_titik, indeks).
+        """
+        key = models.location_key(coords)
+        if key in locations:
+            i = locations[key]
+            point = points[i]
+            stops = point.get("stops") or [point["name"]]
+            if name not in stops:
+                points[i] = {**point, "name": ", ".join(stops + [name]), "stops": stops + [name]}
+            return point["coords"], i
+        locations[key] = len(points)
+        points.append({"name": name, "coords": coords, "stops": [name]})
+        return coords, len(points) - 1
+
+    def location_orders(self, orders=None):
+        """Memetakan kunci lokasi ke pesanan yang dijemput atau diantar di lokasi tersebut."""
+        stops = {}
+        for order in self.orders if orders is None else orders:
+            keys = {models.location_key(order["customer_coords"]), models.location_key(order["destination_coords"])}
+            for key in keys:
+                stops.setdefault(key, []).append(order)
+        return stops
+
+    def expand_route(self, points, route, orders=None):
+        """Mengembalikan daftar pesanan yang dilayani di setiap titik kunjungan rute."""
+        stops = self.location_orders(orders)
+        return [stops.get(models.location_key(points[i]["coords"]), []) for i in route]
+
+    def rebuild_spatial_index(self):
+        """Menyusun ulang indeks spasial dari dapur dan semua titik."""
+        with self._state_lock:
+            self.spatial_index.clear()
+            for i, depot in enumerate(self.depots):
+                self.spatial_index.add(("depot", i), depot["coords"])
+            for i, point in enumerate(self.points):
+                self.spatial_index.add(("point", i), point["coords"])
+
+    def index_new_points(self, start):
+        """Menambahkan titik mulai indeks `start` ke indeks spasial."""
+        with self._state_lock:
+            for i in range(start, len(self.points)):
+                self.spatial_index.add(("point", i), self.points[i]["coords"])
+
+    def _indexed_point(self, key):
+        return self.depots[key[1]] if key[0] == "depot" else self.points[key[1]]
+
+    def nearest_points(self, coords, k=1, max_km=None):
+        """Mencari k titik (termasuk dapur) terdekat; mengembalikan daftar (jarak_km, titik)."""
+        with self._state_lock:
+            return [(d, self._indexed_point(key)) for d, key in self.spatial_index.nearest(coords, k, max_km)]
+
+    def points_within(self, coords, radius_km):
+        """Mencari semua titik (termasuk dapur) dalam radius; mengembalikan daftar (jarak_km, titik)."""
+        with self._state_lock:
+            return [(d, self._indexed_point(key)) for d, key in self.spatial_index.within(coords, radius_km)]
+
+    def snap_coords(self, coords):
+        """Memakai koordinat titik yang sudah ada jika hasil geocode hampir identik dengannya."""
+        with self._state_lock:
+            nearest = self.spatial_index.nearest(coords, 1, DEDUP_RADIUS_KM)
+            if nearest:
+                return self.spatial_index.coords(nearest[0][1])
+        return coords
+
+    def queue_save(self, method, *args):
+        """Mengantrekan satu perubahan untuk sesi; dipanggil dengan _state_lock dipegang.
+
+        Penulisan SQLite dilakukan kemudian oleh flush_saves setelah lock dilepas, jadi
+        pembaca dan penulis state lain tidak menunggu disk.
+        """
+        if self.session is not None:
+            self._pending_saves.append((method, args))
+
+    def flush_saves(self):
+        """Menulis perubahan yang antre ke sesi sesuai urutannya; kegagalan hanya dicatat.
+
+        Dipanggil tanpa _state_lock. Thread mana pun yang memegang _save_lock menulis
+        semua antrean, termasuk milik thread lain, sehingga urutan tulis tetap terjaga.
+        """
+        with self._save_lock:
+            while self._pending_saves:
+                method, args = self._pending_saves.popleft()
+                try:
+                    getattr(self.session, method)(*args)
+                except Exception as e:
+                    logging.error(f"Gagal menyimpan sesi ({method}): {str(e)}")
+
+    def autosave(self, method, *args):
+        """Menyimpan satu perubahan ke sesi jika sesi terbuka (dipanggil tanpa _state_lock)."""
+        self.queue_save(method, *args)
+        self.flush_saves()
+
+    def load_road_network(self, directory=ROAD_NETWORK_DIR):
+        """Memuat graf jalan hasil delivery_roadnet.py jika tersedia."""
+        if not os.path.exists(os.path.join(directory, "meta.json")):
+            logging.info("Graf jalan tidak ditemukan, memakai jarak geodesik.")
+            return None
+        try:
+            from delivery_roadnet import RoadNetwork
+            network = RoadNetwork.load(directory)
+            logging.info(f"Graf jalan dimuat: {network.num_nodes} simpul")
+            return network
+        except Exception as e:
+            logging.error(f"Gagal memuat graf jalan: {str(e)}")
+            return None
+
+    def build_point_set(self, name, points=None):
+        """Menghitung dan menyimpan matriks untuk kumpulan titik tetap (default: dapur + semua titik)."""
+        if points is None:
+            state = self.snapshot()
+            if not state.depots:
+                return False, "Dapur belum ditetapkan."
+            points = state.depots[:1] + state.points
+        try:
+            self.point_matrix = self.matrix_store.build(name, points, self.road_network)
+        except Exception as e:
+            logging.error(f"Gagal membuat matriks titik {name}: {str(e)}")
+            return False, f"Gagal membuat matriks: {str(e)}"
+        return True, f"Matriks untuk {len(points)} titik disimpan sebagai '{name}'."
+
+    def use_point_set(self, name):
+        """Memakai matriks tersimpan untuk pesanan yang titiknya termasuk di dalamnya."""
+        if not self.matrix_store.exists(name):
+            return False, f"Matriks '{name}' tidak ditemukan."
+        try:
+            self.point_matrix = self.matrix_store.open(name)
+        except Exception as e:
+            logging.error(f"Gagal membuka matriks titik {name}: {str(e)}")
+            return False, f"Gagal membuka matriks: {str(e)}"
+        logging.info(f"Matriks titik dipakai: {name} ({len(self.point_matrix)} titik)")
+        return True, f"Matriks '{name}' dipakai."
+
+    def output_path(self, filename):
+        """Mengembalikan path file keluaran di dalam output_dir."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, filename)
+
+    def save_map(self, m, filename, label="Peta"):
+        """Menyimpan peta folium dan membukanya di browser jika open_browser aktif."""
+        with metrics.timer("map_render"):
+            m.save(filename)
+        logging.info(f"{label} disimpan: {filename}")
+        if not self.open_browser:
+            return
+        try:
+            webbrowser.open(filename)
+            logging.info(f"{label} dibuka: {filename}")
+        except Exception as e:
+            logging.error(f"Gagal membuka peta: {str(e)}")
+
+    def get_metrics(self):
+        """Mengembalikan counter dan histogram latensi tahap-tahap perhitungan."""
+        return metrics.snapshot()
 
     def load_cache(self):
         """Memuat cache alamat dari file."""
-        try:
-            with open("geocache.json", "r") as f:
-                return json.load(f)
-        except:
-            return {}
+        return GeocodeCache.load(GEOCACHE_FILE)
 
     def save_cache(self):
         """Menyimpan cache alamat ke file."""
-        with open("geocache.json", "w") as f:
-            json.dump(self.geocache, f)
+        self.geocache.save(GEOCACHE_FILE)
 
     def geocode_address(self, address, progress_callback=None):
-        """Mengubah alamat menjadi koordinat GPS."""
+        """Mengubah alamat menjadi koordinat GPS.
+
+        Aman dipanggil dari banyak thread; alamat yang sedang di-geocode thread lain
+        ditunggu hasilnya alih-alih diminta ulang ke Nominatim.
+        """
         full_address = f"{address}, Cirebon, Indonesia"
         logging.debug(f"Geocoding alamat: {full_address}")
-        if full_address in self.geocache:
-            logging.debug(f"Menggunakan cache untuk: {full_address}")
-            return self.geocache[full_address]
+
+        def fetch():
+            with metrics.timer("geocode"):
+                location = self.geolocator.geocode(full_address)
+            return (location.latitude, location.longitude) if location else None
+
         try:
-            location = self.geolocator.geocode(full_address)
+            coords, fetched = self.geocache.get_or_fetch(full_address, fetch)
+            if not fetched:
+                logging.debug(f"Menggunakan cache untuk: {full_address}")
+                metrics.increment("geocode.cache_hit")
+                return coords
+            metrics.increment("geocode.cache_miss")
             if progress_callback:
                 progress_callback()
-            if not location:
+            if not coords:
                 logging.error(f"Alamat tidak ditemukan: {full_address}")
                 return None
-            coords = (location.latitude, location.longitude)
-            self.geocache[full_address] = coords
             self.save_cache()
             logging.debug(f"Koordinat ditemukan: {coords}")
             return coords
@@ -56,23 +398,57 @@ class DeliveryController:
             logging.error(f"Error geocoding {full_address}: {str(e)}")
             return None, f"Gagal mengambil koordinat: {str(e)}. Pastikan koneksi internet aktif."
 
-    def set_depot(self, name, address, progress_callback=None):
-        """Menetapkan lokasi dapur/restoran."""
+    def _geocode_depot(self, name, address, progress_callback=None):
+        """Geocode dan validasi alamat dapur; mengembalikan (dapur, pesan_error)."""
         if not name or not address:
-            return False, "Nama dan alamat dapur harus diisi."
+            return None, "Nama dan alamat dapur harus diisi."
         result = self.geocode_address(address, progress_callback)
         if isinstance(result, tuple) and len(result) == 2:
             coords, error = result, None
         else:
             coords, error = None, result
-        if not coords:
-            return False, error or "Alamat dapur tidak ditemukan. Tambahkan detail seperti 'Cirebon' atau nomor jalan."
+        if not coords or coords[0] is None:
+            return None, error or "Alamat dapur tidak ditemukan. Tambahkan detail seperti 'Cirebon' atau nomor jalan."
         if not models.validate_coords(*coords):
-            return False, "Alamat harus berada di wilayah Cirebon (lat: -6.9 hingga -6.5, lon: 108.4 hingga 108.7)."
-        self.depot = {"name": name, "coords": coords}
-        logging.info(f"Dapur ditetapkan: {name}, {coords}")
+            return None, "Alamat harus berada di wilayah Cirebon (lat: -6.9 hingga -6.5, lon: 108.4 hingga 108.7)."
+        return {"name": name, "coords": coords}, None
+
+    def set_depot(self, name, address, progress_callback=None):
+        """Menetapkan lokasi dapur/restoran utama."""
+        depot, error = self._geocode_depot(name, address, progress_callback)
+        if error:
+            return False, error
+        with self._state_lock:
+            self.depot = depot
+            self.spatial_index.add(("depot", 0), depot["coords"])
+            self.queue_save("save_depots", self.depots)
+            self.reset_order_depots()
+        self.flush_saves()
+        logging.info(f"Dapur ditetapkan: {name}, {depot['coords']}")
         return True, "Dapur berhasil ditetapkan."
 
+    def add_depot(self, name, address, progress_callback=None):
+        """Menambahkan dapur lain untuk perencanaan multi-dapur."""
+        if not self.depots:
+            return self.set_depot(name, address, progress_callback)
+        if any(d["name"] == name for d in self.depots):
+            return False, f"Dapur {name} sudah ada."
+        depot, error = self._geocode_depot(name, address, progress_callback)
+        if error:
+            return False, error
+        with self._state_lock:
+            if any(d["name"] == name for d in self.depots):
+                return False, f"Dapur {name} sudah ada."
+            self.depots = self.depots + [depot]
+            count = len(self.depots)
+            self.spatial_index.add(("depot", count - 1), depot["coords"])
+            self.version += 1
+            self.queue_save("save_depots", self.depots, count - 1)
+            self.reset_order_depots()
+        self.flush_saves()
+        logging.info(f"Dapur tambahan: {name}, {depot['coords']}")
+        return True, f"Dapur {name} ditambahkan ({count} dapur)."
+
     def add_or_update_order(self, order_id, courier, customer, customer_address, destination, destination_address, order, price, progress_callback=None):
         """Menambahkan atau memperbarui pesanan."""
         try:
@@ -89,36 +465,51 @@ class DeliveryController:
             if not models.validate_coords(*destination_coords):
                 return False, "Alamat pengiriman harus di wilayah Cirebon."
             
-            customer_exists = any(p["name"] == customer for p in self.points) or (self.depot and self.depot["name"] == customer)
-            if not customer_exists:
-                self.points.append({"name": customer, "coords": customer_coords})
-            
-            destination_exists = any(p["name"] == destination for p in self.points) or (self.depot and self.depot["name"] == destination)
-            if not destination_exists:
-                self.points.append({"name": destination, "coords": destination_coords})
-            
-            order_data = {
-                "id": order_id or str(uuid.uuid4()),
-                "courier": courier,
-                "customer": customer,
-                "customer_coords": customer_coords,
-                "destination": destination,
-                "destination_coords": destination_coords,
-                "order": order,
-                "price": price,
-                "customer_address": customer_address,
-                "destination_address": destination_address
-            }
-            
-            if order_id:
-                for i, o in enumerate(self.orders):
-                    if o["id"] == order_id:
-                        self.orders[i] = order_data
-                        logging.info(f"Pesanan diperbarui: {order_id}")
-                        break
-            else:
-                self.orders.append(order_data)
-                logging.info(f"Pesanan baru: {order_data['id']}")
+            # Copy-on-write: titik dan pesanan disusun di salinan lalu ditukar di bawah lock,
+            # sehingga snapshot yang sedang dipakai pembaca tidak ikut berubah.
+            with self._state_lock:
+                points = list(self.points)
+                locations = dict(self.locations)
+                orders = list(self.orders)
+                points_before = len(points)
+                customer_coords, customer_idx = self.intern_point(
+                    points, locations, customer, self.snap_coords(customer_coords))
+                destination_coords, destination_idx = self.intern_point(
+                    points, locations, destination, self.snap_coords(destination_coords))
+                changed_from = min(customer_idx, destination_idx, points_before)
+                
+                order_data = {
+                    "id": order_id or str(uuid.uuid4()),
+                    "courier": courier,
+                    "customer": customer,
+                    "customer_coords": customer_coords,
+                    "destination": destination,
+                    "destination_coords": destination_coords,
+                    "order": order,
+                    "price": price,
+                    "customer_address": customer_address,
+                    "destination_address": destination_address
+                }
+                
+                if order_id and any(o["id"] == order_id for o in orders):
+                    for i, o in enumerate(orders):
+                        if o["id"] == order_id:
+                            orders[i] = order_data
+                            position = i
+                            logging.info(f"Pesanan diperbarui: {order_id}")
+                            break
+                else:
+                    orders.append(order_data)
+                    position = len(orders) - 1
+                    logging.info(f"Pesanan baru: {order_data['id']}")
+                
+                self.points, self.locations, self.orders = points, locations, orders
+                self.version += 1
+                self.index_new_points(points_before)
+                self.queue_save("save_points", self.points, changed_from)
+                self.queue_save("save_orders", [order_data], [position])
+                self.reset_order_depots([order_data["id"]])
+            self.flush_saves()
             
             return True, "Pesanan berhasil disimpan."
         except ValueError:
@@ -127,57 +518,399 @@ class DeliveryController:
             logging.error(f"Error menambah pesanan: {str(e)}")
             return False, f"Gagal: {str(e)}. Pastikan koneksi internet aktif."
 
+    def import_orders(self, path, skip_invalid=False, progress_callback=None):
+        """Mengimpor banyak pesanan dari file CSV/JSON sekaligus.
+
+        Semua baris divalidasi dalam satu kali jalan. Jika ada error dan `skip_invalid`
+        False, tidak ada pesanan yang ditambahkan. Mengembalikan (berhasil, pesan, errors)
+        dengan errors berupa dict nomor baris (mulai 0) -> daftar pesan.
+        """
+        import numpy as np
+        from delivery_import import iter_order_rows, normalize_row, validate_rows, format_errors
+        try:
+            rows = [normalize_row(row) for row in iter_order_rows(path)]
+        except Exception as e:
+            logging.error(f"Gagal membaca file pesanan {path}: {str(e)}")
+            return False, f"Gagal membaca file: {str(e)}", {}
+        if not rows:
+            return False, "File tidak berisi pesanan.", {}
+
+        prices, errors = validate_rows(rows)
+        addresses = sorted({row[field] for row in rows
+                            for field in ("customer_address", "destination_address") if row[field]})
+        coords = {}
+        for address in addresses:
+            result = self.geocode_address(address, progress_callback)
+            coords[address] = self.snap_coords(result) if result and result[0] is not None else None
+
+        for field, label in (("customer_address", "pelanggan"), ("destination_address", "pengiriman")):
+            latlon = np.array([coords.get(row[field]) or (np.nan, np.nan) for row in rows], dtype=np.float64)
+            valid = models.validate_coords_array(latlon[:, 0], latlon[:, 1])
+            for i in np.flatnonzero(~valid):
+                i = int(i)
+                if not rows[i][field]:
+                    continue
+                if coords.get(rows[i][field]) is None:
+                    errors.setdefault(i, []).append(f"Alamat {label} tidak ditemukan.")
+                else:
+                    errors.setdefault(i, []).append(f"Alamat {label} harus di wilayah Cirebon.")
+
+        if errors and not skip_invalid:
+            logging.error(f"Impor dibatalkan, {len(errors)} baris tidak valid: {path}")
+            return False, "Impor dibatalkan, tidak ada pesanan yang ditambahkan.\n" + format_errors(errors, limit=20), errors
+
+        # Titik dan pesanan disusun di salinan, lalu diganti sekaligus agar atomik. Lock
+        # dipegang selama penyusunan agar penulis lain tidak tertimpa; geocode sudah selesai.
+        with self._state_lock:
+            points = list(self.points)
+            locations = dict(self.locations)
+            orders = list(self.orders)
+            order_index = {o["id"]: i for i, o in enumerate(orders)}
+            imported = 0
+            changed = []
+            changed_from = len(points)
+            for i, row in enumerate(rows):
+                if i in errors:
+                    continue
+                customer_coords, customer_idx = self.intern_point(
+                    points, locations, row["customer"], coords[row["customer_address"]])
+                destination_coords, destination_idx = self.intern_point(
+                    points, locations, row["destination"], coords[row["destination_address"]])
+                changed_from = min(customer_idx, destination_idx, changed_from)
+                order_data = {
+                    "id": row["id"] or str(uuid.uuid4()),
+                    "courier": row["courier"],
+                    "customer": row["customer"],
+                    "customer_coords": customer_coords,
+                    "destination": row["destination"],
+                    "destination_coords": destination_coords,
+                    "order": row["order"],
+                    "price": float(prices[i]),
+                    "customer_address": row["customer_address"],
+                    "destination_address": row["destination_address"]
+                }
+                if order_data["id"] in order_index:
+                    orders[order_index[order_data["id"]]] = order_data
+                else:
+                    order_index[order_data["id"]] = len(orders)
+                    orders.append(order_data)
+                changed.append(order_data)
+                imported += 1
+
+            points_before = len(self.points)
+            self.points, self.locations, self.orders = points, locations, orders
+            self.version += 1
+            self.index_new_points(points_before)
+            self.queue_save("save_points", self.points, changed_from)
+            self.queue_save("save_orders", changed, [order_index[o["id"]] for o in changed])
+            self.reset_order_depots([o["id"] for o in changed])
+        self.flush_saves()
+
+        logging.info(f"{imported} pesanan diimpor dari {path}, {len(errors)} baris dilewati")
+        message = f"{imported} pesanan berhasil diimpor."
+        if errors:
+            message += f" {len(errors)} baris dilewati:\n" + format_errors(errors, limit=20)
+        return True, message, errors
+
+    def order_points(self, order):
+        """Menyusun titik rute satu pesanan: dapur (yang ditugaskan), pelanggan, dan tujuan.
+
+        Jika ada beberapa dapur dan pesanan belum ditugaskan, semua pesanan ditugaskan
+        dulu lewat assign_orders_to_depots.
+        """
+        with self._state_lock:
+            depots, order_depots = self.depots, self.order_depots
+        if len(depots) > 1 and order["id"] not in order_depots:
+            self.assign_orders_to_depots()
+            with self._state_lock:
+                depots, order_depots = self.depots, self.order_depots
+        depot = depots[order_depots.get(order["id"], 0)]
+        if models.location_key(order["customer_coords"]) == models.location_key(order["destination_coords"]):
+            return [depot, {"name": order["destination"], "coords": order["destination_coords"]}]
+        return [
+            depot,
+            {"name": order["customer"], "coords": order["customer_coords"]},
+            {"name": order["destination"], "coords": order["destination_coords"]}
+        ]
+
+    def reset_order_depots(self, order_ids=None):
+        """Menghapus penugasan dapur (semua, atau hanya `order_ids`) agar dihitung ulang.
+
+        Dipanggil dengan _state_lock dipegang setelah dapur atau alamat pesanan berubah;
+        pemanggil menjalankan flush_saves setelah lock dilepas.
+        """
+        if order_ids is None:
+            order_depots = {}
+        else:
+            drop = set(order_ids)
+            order_depots = {k: v for k, v in self.order_depots.items() if k not in drop}
+        if len(order_depots) != len(self.order_depots):
+            self.order_depots = order_depots
+            self.queue_save("save_order_depots", order_depots)
+
+    def matrix_source(self):
+        """Identitas sumber jarak: graf jalan (atau geodesik) dan matriks titik yang dipakai."""
+        road = self.road_network.fingerprint if self.road_network is not None else "geodesic"
+        point_set = self.point_matrix.fingerprint if self.point_matrix is not None else "-"
+        return f"{road}|{point_set}"
+
+    def build_matrices(self, points):
+        """Membuat matriks jarak dan waktu tempuh untuk titik-titik rute (di-cache per bucket waktu)."""
+        # Matriks dihitung di luar lock; dua thread yang menghitung kunci sama hanya
+        # menghasilkan matriks yang identik. Cache memori dibatasi MATRIX_CACHE_SIZE (LRU),
+        # matriks lama dibaca ulang dari sesi saat dibutuhkan. Kunci memuat sumber jarak dan
+        # profil kecepatan, jadi matriks dari graf/profil lain tidak terpakai ulang.
+        key = (f"{self.matrix_source()}|{self.speed_profile.fingerprint}|"
+               f"{self.speed_profile.bucket(self.departure_hour)}|{matrix_key(points)}")
+        with self._matrix_lock:
+            matrices = self.matrix_cache.get(key)
+            if matrices is not None:
+                self.matrix_cache.move_to_end(key)
+                return matrices
+        if self.session is not None:
+            matrices = self.session.load_matrix(key)
+            if matrices is not None:
+                self.cache_matrices(key, matrices)
+                return matrices
+        distance_matrix, base_time = models.create_matrices(points, self.road_network, self.point_matrix)
+        time_matrix = self.speed_profile.time_matrix(points, distance_matrix, self.departure_hour, base_time)
+        self.cache_matrices(key, (distance_matrix, time_matrix))
+        self.autosave("save_matrix", key, distance_matrix, time_matrix)
+        return distance_matrix, time_matrix
+
+    def cache_matrices(self, key, matrices):
+        with self._matrix_lock:
+            self.matrix_cache[key] = matrices
+            self.matrix_cache.move_to_end(key)
+            if len(self.matrix_cache) > MATRIX_CACHE_SIZE:
+                self.matrix_cache.popitem(last=False)
+
     def calculate_route_for_order(self, order):
         """Menghitung rute untuk satu pesanan."""
         if not self.depot:
             return None, None, None, "Dapur belum ditetapkan."
         
-        customer_coords = order["customer_coords"]
-        destination_coords = order["destination_coords"]
-        
-        if order["customer"] == order["destination"]:
-            points = [self.depot, {"name": order["destination"], "coords": destination_coords}]
-            start_idx = 0
-        else:
-            points = [
-                self.depot,
-                {"name": order["customer"], "coords": customer_coords},
-                {"name": order["destination"], "coords": destination_coords}
-            ]
-            start_idx = 0
-        
-        distance_matrix = models.create_distance_matrix(points)
-        route, total_distance, segments = models.find_shortest_route(distance_matrix, num_vehicles=1, start_idx=start_idx)
+        points = self.order_points(order)
+        start_idx = 0
+        distance_matrix, time_matrix = self.build_matrices(points)
+        start = time.perf_counter()
+        route, total_distance, segments = models.find_shortest_route(
+            distance_matrix, num_vehicles=1, start_idx=start_idx, time_matrix=time_matrix)
+        solve_time = time.perf_counter() - start
         if route is None:
             logging.error(f"Gagal menghitung rute untuk pesanan: {order['id']}")
             return None, None, None, "Gagal menghitung rute."
         
-        self.routes[order["id"]] = (points, route, total_distance, segments)
+        self.store_route(order["id"], (points, route, total_distance, segments), solve_time)
         logging.info(f"Rute dihitung untuk pesanan: {order['id']}")
         return points, route, (total_distance, segments[0], segments[1]), None
 
-    def calculate_multi_drop_route(self):
-        """Menghitung rute multi-drop untuk semua pesanan."""
-        if not self.depot:
+    def calculate_multi_drop_route(self, on_progress=None, time_limit=10):
+        """Menghitung rute multi-drop untuk semua pesanan.
+
+        `on_progress(points, route, total_distance, segments, mst_edges)` menerima setiap rute
+        yang lebih baik selama pencarian (dari thread pemanggil). Pencarian bisa dihentikan
+        lewat cancel_solve(); hasilnya rute terbaik yang sudah ditemukan.
+        """
+        state = self.snapshot()
+        if not state.depots:
             return None, None, None, None, "Dapur belum ditetapkan."
-        points = [self.depot] + self.points
+        points = state.depots[:1] + state.points
         if len(points) < 2:
             return None, None, None, None, "Tambahkan setidaknya satu pesanan."
         
-        distance_matrix = models.create_distance_matrix(points)
-        route, total_distance, segments, mst_edges = models.find_multi_drop_route(points, distance_matrix)
+        distance_matrix, time_matrix = self.build_matrices(points)
+        edges = candidate_edges(points, CANDIDATE_EDGE_K) if len(points) >= CANDIDATE_EDGE_MIN_POINTS else None
+        on_solution = None
+        if on_progress is not None:
+            def on_solution(route, total_distance, segments, mst_edges):
+                on_progress(points, route, total_distance, segments, mst_edges)
+        cancel = threading.Event()
+        with self._state_lock:
+            self.solve_cancels.add(cancel)
+        start = time.perf_counter()
+        try:
+            route, total_distance, segments, mst_edges = models.find_multi_drop_route(
+                points, distance_matrix, max_stops=len(points), time_matrix=time_matrix,
+                time_limit=time_limit, candidate_edges=edges, on_solution=on_solution, cancel_event=cancel)
+        finally:
+            with self._state_lock:
+                self.solve_cancels.discard(cancel)
+        cancelled = cancel.is_set()
+        solve_time = time.perf_counter() - start
         if route is None:
             logging.error("Gagal menghitung rute multi-drop.")
             return None, None, None, None, "Gagal menghitung rute."
         
-        self.routes["multi_drop"] = (points, route, total_distance, segments, mst_edges)
-        logging.info("Rute multi-drop dihitung.")
+        self.store_route("multi_drop", (points, route, total_distance, segments, mst_edges), solve_time)
+        logging.info("Rute multi-drop dihitung" + (" (dihentikan lebih awal)." if cancelled else "."))
         return points, route, (total_distance, segments[0], segments[1]), mst_edges, None
 
+    def cancel_solve(self):
+        """Menghentikan semua perhitungan rute multi-drop yang sedang berjalan."""
+        with self._state_lock:
+            cancels = list(self.solve_cancels)
+        if not cancels:
+            return False, "Tidak ada perhitungan rute yang berjalan."
+        for cancel in cancels:
+            cancel.set()
+        logging.info("Perhitungan rute multi-drop dibatalkan.")
+        return True, "Perhitungan dihentikan, memakai rute terbaik sejauh ini."
+
+    def assign_orders_to_depots(self, state=None):
+        """Menugaskan setiap pesanan ke dapur dengan biaya tempuh terkecil.
+
+        Biaya = jarak dapur -> pelanggan + jarak dapur -> tujuan, dihitung dari satu
+        matriks dapur x titik (pencarian jalan hanya dari dapur; jarak dapur -> tujuan
+        mewakili perjalanan kembali tujuan -> dapur). Mengembalikan dict indeks dapur ->
+        daftar pesanan.
+        """
+        import numpy as np
+        state = state or self.snapshot()
+        if not state.orders:
+            return {}
+        targets, target_index = [], {}
+        for order in state.orders:
+            for field in ("customer_coords", "destination_coords"):
+                coords = tuple(order[field])
+                if coords not in target_index:
+                    target_index[coords] = len(targets)
+                    targets.append({"name": "", "coords": coords})
+        cost = models.create_cost_matrix(state.depots, targets, self.road_network)
+        customer_idx = np.array([target_index[tuple(o["customer_coords"])] for o in state.orders])
+        destination_idx = np.array([target_index[tuple(o["destination_coords"])] for o in state.orders])
+        best = np.argmin(cost[:, customer_idx] + cost[:, destination_idx], axis=0)
+
+        order_depots = {o["id"]: int(d) for o, d in zip(state.orders, best)}
+        with self._state_lock:
+            self.order_depots = {**self.order_depots, **order_depots}
+            self.version += 1
+            self.queue_save("save_order_depots", self.order_depots)
+        self.flush_saves()
+        assignment = {}
+        for order, depot_idx in zip(state.orders, best):
+            assignment.setdefault(int(depot_idx), []).append(order)
+        logging.info("Penugasan dapur: " + ", ".join(
+            f"{state.depots[d]['name']}={len(o)}" for d, o in sorted(assignment.items())))
+        return assignment
+
+    def calculate_multi_depot_routes(self, max_workers=None, on_progress=None, time_limit=10):
+        """Menghitung rute multi-drop untuk setiap dapur secara paralel.
+
+        Mengembalikan (hasil, error); hasil berupa daftar dict per dapur berisi depot_idx,
+        points, route, total_distance, segments, mst_edges, dan orders. `on_progress(hasil)`
+        menerima dict yang sama setiap rute satu dapur membaik (dari thread pemanggil), dan
+        cancel_solve() menghentikan semua solver dengan rute terbaik sejauh ini.
+        """
+        state = self.snapshot()
+        if not state.depots:
+            return None, "Dapur belum ditetapkan."
+        if not state.orders:
+            return None, "Tambahkan setidaknya satu pesanan."
+        assignment = self.assign_orders_to_depots(state)
+
+        jobs = []
+        for depot_idx, orders in sorted(assignment.items()):
+            indices = []
+            for order in orders:
+                for field in ("customer_coords", "destination_coords"):
+                    i = state.locations.get(models.location_key(order[field]))
+                    if i is not None and i not in indices:
+                        indices.append(i)
+            points = [state.depots[depot_idx]] + [state.points[i] for i in indices]
+            distance_matrix, time_matrix = self.build_matrices(points)
+            edges = candidate_edges(points, CANDIDATE_EDGE_K) if len(points) >= CANDIDATE_EDGE_MIN_POINTS else None
+            jobs.append((depot_idx, orders, points, distance_matrix, time_matrix, edges))
+
+        results = []
+        jobs_by_depot = {job[0]: job for job in jobs}
+        # spawn: proses solver tidak mewarisi thread dan lock (state, sesi, UI) lewat fork.
+        # threading.Event tidak bisa dikirim ke proses lain, jadi tanda batal dan antrean
+        # progres dibuat oleh Manager.
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager, ProcessPoolExecutor(
+                max_workers=max_workers or min(len(jobs), os.cpu_count() or 1), mp_context=context) as pool:
+            cancel = manager.Event()
+            updates = manager.Queue() if on_progress is not None else None
+            with self._state_lock:
+                self.solve_cancels.add(cancel)
+            try:
+                futures = [pool.submit(_solve_depot_route, depot_idx, points, distance_matrix, time_matrix,
+                                       edges, time_limit, cancel, updates)
+                           for depot_idx, _, points, distance_matrix, time_matrix, edges in jobs]
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(pending, timeout=SOLVE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    while updates is not None:
+                        try:
+                            depot_idx, (route, total_distance, segments, mst_edges) = updates.get_nowait()
+                        except queue.Empty:
+                            break
+                        _, orders, points, _, _, _ = jobs_by_depot[depot_idx]
+                        on_progress({"depot_idx": depot_idx, "points": points, "route": route,
+                                     "total_distance": total_distance, "segments": segments,
+                                     "mst_edges": mst_edges, "orders": orders})
+            finally:
+                with self._state_lock:
+                    self.solve_cancels.discard(cancel)
+            for (depot_idx, orders, points, _, _, _), future in zip(jobs, futures):
+                (route, total_distance, segments, mst_edges), solve_time = future.result()
+                if route is None:
+                    logging.error(f"Gagal menghitung rute dapur {points[0]['name']}.")
+                    return None, f"Gagal menghitung rute untuk dapur {points[0]['name']}."
+                key = f"multi_drop:{depot_idx}"
+                metrics.observe("solve.multi_drop", solve_time)
+                self.store_route(key, (points, route, total_distance, segments, mst_edges), solve_time)
+                results.append({"depot_idx": depot_idx, "points": points, "route": route,
+                                "total_distance": total_distance, "segments": segments,
+                                "mst_edges": mst_edges, "orders": orders})
+        # Dapur yang kali ini tidak mendapat pesanan tidak boleh menyisakan rute lama
+        # (akan ikut terhitung di analitik dan ekspor).
+        current = {f"multi_drop:{r['depot_idx']}" for r in results}
+        self.drop_routes([key for key in self.snapshot().routes
+                          if key.startswith("multi_drop:") and key not in current])
+        logging.info(f"Rute multi-dapur dihitung untuk {len(results)} dapur.")
+        return results, None
+
+    def generate_map_for_multi_depot(self, results):
+        """Membuat peta multi-dapur dengan satu layer per dapur."""
+        filename = self.output_path("delivery_map_multi_depot.html")
+        import folium
+        m = folium.Map(location=(-6.7320, 108.5523), zoom_start=12, tiles="CartoDB positron")
+        
+        for result in results:
+            depot = result["points"][0]
+            color = DEPOT_COLORS[result["depot_idx"] % len(DEPOT_COLORS)]
+            layer = folium.FeatureGroup(name=f"{depot['name']} ({len(result['orders'])} pesanan)")
+            points, route = result["points"], result["route"]
+            segment_distances, segment_times = result["segments"]
+            for i, point in enumerate(points):
+                folium.Marker(
+                    location=point["coords"],
+                    popup=folium.Popup(f"<b>{point['name']}</b>", max_width=200),
+                    icon=folium.Icon(color=color, icon="home" if i == 0 else "info-sign")
+                ).add_to(layer)
+            for i in range(len(route) - 1):
+                popup_content = (
+                    f"<b>{points[route[i]]['name']} -> {points[route[i + 1]]['name']}</b><br>"
+                    f"Jarak: {segment_distances[i]:.2f} km<br>Waktu: {segment_times[i]:.2f} menit"
+                )
+                folium.PolyLine(
+                    [points[route[i]]["coords"], points[route[i + 1]]["coords"]],
+                    color=color, weight=3, opacity=0.8
+                ).add_child(folium.Popup(popup_content, max_width=200)).add_to(layer)
+            layer.add_to(m)
+        folium.LayerControl(collapsed=False).add_to(m)
+        
+        self.save_map(m, filename, "Peta multi-dapur")
+        return filename
+
     def generate_map_for_order(self, order, points, route, segment_distances, segment_times):
         """Membuat peta untuk satu pesanan."""
-        filename = f"delivery_map_{order['id']}.html"
+        filename = self.output_path(f"delivery_map_{order['id']}.html")
         logging.debug(f"Membuat peta: {filename}")
+        import folium
+        from folium.plugins import PolyLineTextPath
         m = folium.Map(location=(-6.7320, 108.5523), zoom_start=12, tiles="CartoDB positron")
         
         for i, point in enumerate(points):
@@ -209,26 +942,25 @@ class DeliveryController:
                 offset=-5
             ).add_to(m)
         
-        m.save(filename)
-        logging.info(f"Peta disimpan: {filename}")
-        try:
-            webbrowser.open(filename)
-            logging.info(f"Peta dibuka: {filename}")
-        except Exception as e:
-            logging.error(f"Gagal membuka peta: {str(e)}")
+        self.save_map(m, filename, "Peta")
         return filename
 
     def generate_map_for_multi_drop(self, points, route, segment_distances, segment_times, mst_edges):
         """Membuat peta untuk rute multi-drop dengan MST."""
-        filename = "delivery_map_multi_drop.html"
+        filename = self.output_path("delivery_map_multi_drop.html")
         logging.debug(f"Membuat peta multi-drop: {filename}")
+        import folium
+        from folium.plugins import PolyLineTextPath
         m = folium.Map(location=(-6.7320, 108.5523), zoom_start=12, tiles="CartoDB positron")
         
+        stops = self.location_orders()
         for i, point in enumerate(points):
-            popup_content = f"<b>{point['name']}</b>"
+            popup_content = f"<b>{point['name']}</b>" + "".join(
+                f"<br>{o['order']} ({o['customer']} -> {o['destination']})"
+                for o in stops.get(models.location_key(point["coords"]), []) if i > 0)
             folium.Marker(
                 location=point['coords'],
-                popup=folium.Popup(popup_content, max_width=200),
+                popup=folium.Popup(popup_content, max_width=250),
                 icon=folium.Icon(color="red" if point["name"] == self.depot["name"] else "blue")
             ).add_to(m)
 
@@ -262,24 +994,19 @@ class DeliveryController:
                 offset=-5
             ).add_to(m)
         
-        m.save(filename)
-        logging.info(f"Peta multi-drop disimpan: {filename}")
-        try:
-            webbrowser.open(filename)
-            logging.info(f"Peta multi-drop dibuka: {filename}")
-        except Exception as e:
-            logging.error(f"Gagal membuka peta: {str(e)}")
+        self.save_map(m, filename, "Peta multi-drop")
         return filename
 
     def generate_all_points_map(self):
         """Membuat peta dengan semua titik (dapur dan alamat)."""
-        if not self.depot:
+        state = self.snapshot()
+        if not state.depots:
             return None, "Dapur belum ditetapkan."
-        points = [self.depot] + self.points
-        if not points:
-            return None, "Tidak ada titik untuk ditampilkan."
+        points = state.depots[:1] + state.points
+        depot_name = points[0]["name"]
         
-        filename = "all_points_map.html"
+        filename = self.output_path("all_points_map.html")
+        import folium
         m = folium.Map(location=(-6.7320, 108.5523), zoom_start=12, tiles="CartoDB positron")
         
         for point in points:
@@ -287,49 +1014,41 @@ class DeliveryController:
             folium.Marker(
                 location=point['coords'],
                 popup=folium.Popup(popup_content, max_width=200),
-                icon=folium.Icon(color="red" if point["name"] == self.depot["name"] else "blue")
+                icon=folium.Icon(color="red" if point["name"] == depot_name else "blue")
             ).add_to(m)
         
-        m.save(filename)
-        logging.info(f"Peta semua titik disimpan: {filename}")
-        try:
-            webbrowser.open(filename)
-            logging.info(f"Peta semua titik dibuka: {filename}")
-        except Exception as e:
-            logging.error(f"Gagal membuka peta: {str(e)}")
+        self.save_map(m, filename, "Peta semua titik")
         return filename, None
 
-    def export_to_csv(self):
-        """Mengekspor data pesanan ke CSV."""
-        data = []
-        if "multi_drop" in self.routes:
-            points, route, total_distance, (segment_distances, segment_times), _ = self.routes["multi_drop"]
-            route_str = " -> ".join(points[i]["name"] for i in route)
-            data.append({
-                "ID": "Multi-Drop",
-                "Kurir": self.orders[0]["courier"] if self.orders else "N/A",
-                "Pelanggan": "Semua",
-                "Tujuan": "Semua",
-                "Pesanan": "; ".join(o["order"] for o in self.orders),
-                "Harga": sum(o["price"] for o in self.orders),
-                "Jarak": total_distance,
-                "Waktu": sum(segment_times),
-                "Rute": route_str
-            })
-        for order in self.orders:
-            if order["id"] in self.routes:
-                points, route, total_distance, (segment_distances, segment_times) = self.routes[order["id"]]
-                data.append({
-                    "ID": order["id"][:8],
-                    "Kurir": order["courier"],
-                    "Pelanggan": order["customer"],
-                    "Tujuan": order["destination"],
-                    "Pesanan": order["order"],
-                    "Harga": order["price"],
-                    "Jarak": total_distance,
-                    "Waktu": sum(segment_times)
-                })
-        import pandas as pd
-        pd.DataFrame(data).to_csv("orders.csv", index=False)
-        logging.info("Pesanan diekspor ke orders.csv")
-        return "Pesanan diekspor ke orders.csv"
\ No newline at end of file
+    def route_analytics(self, state=None):
+        """Analitik kualitas rute tersimpan: gap terhadap batas bawah MST, penghematan, waktu hitung."""
+        state = state or self.snapshot()
+        with self._state_lock:
+            solve_times = dict(self.solve_times)
+        return route_analytics(state.routes, solve_times, [o["id"] for o in state.orders])
+
+    def route_groups(self, state=None):
+        """Memetakan kunci rute multi-drop ke pesanan yang dilayaninya."""
+        state = state or self.snapshot()
+        groups = {"multi_drop": state.orders}
+        for order in state.orders:
+            if order["id"] in state.order_depots:
+                groups.setdefault(f"multi_drop:{state.order_depots[order['id']]}", []).append(order)
+        return groups
+
+    @metrics.timed("export")
+    def export_to_csv(self, path=None, segments=True):
+        """Mengekspor data pesanan (dan rincian ruas rute) ke CSV, Parquet, atau Arrow.
+
+        Format dipilih dari ekstensi `path`; baris ditulis secara streaming.
+        Mengembalikan (berhasil, pesan).
+        """
+        path = path or self.output_path("orders.csv")
+        state = self.snapshot()
+        try:
+            export_rows(iter_export_rows(state.orders, state.routes, segments, self.route_groups(state),
+                                         self.expand_route, self.route_analytics(state)), path)
+        except Exception as e:
+            logging.error(f"Gagal mengekspor ke {path}: {str(e)}")
+            return False, f"Gagal mengekspor: {str(e)}"
+        return True, f"Pesanan diekspor ke {path}"
\ No newline at end of file
@@ -0,0 +1,153 @@
+import csv
+import logging
+
+# Kolom ekspor. Baris "Pesanan" meringkas satu rute, baris "Segmen" merinci tiap ruasnya,
+# dan baris "Ringkasan" membandingkan total per pesanan dengan rute gabungan ("Hemat" =
+# rasio jarak yang dihemat rute gabungan).
+EXPORT_COLUMNS = ["ID", "Jenis", "Kurir", "Pelanggan", "Tujuan", "Pesanan", "Harga",
+                  "Jarak", "Waktu", "Rute", "Segmen", "Dari", "Ke",
+                  "Batas MST", "Gap", "Hemat", "Waktu Hitung"]
+PARQUET_BATCH_SIZE = 10000
+
+def _route_str(points, route):
+    return " -> ".join(points[i]["name"] for i in route)
+
+def _segment_rows(row_id, points, route, segment_distances, segment_times, stop_orders=None):
+    for i, (dist, minutes) in enumerate(zip(segment_distances, segment_times)):
+        row = {"ID": row_id, "Jenis": "Segmen", "Segmen": i + 1,
+               "Dari": points[route[i]]["name"], "Ke": points[route[i + 1]]["name"],
+               "Jarak": float(dist), "Waktu": float(minutes)}
+        if stop_orders and route[i + 1] != route[0]:
+            row["Pesanan"] = "; ".join(o["order"] for o in stop_orders[i + 1])
+        yield row
+
+def _analytics_columns(stats):
+    return {"Batas MST": stats["lower_bound"], "Gap": stats["gap"], "Waktu Hitung": stats["solve_time"]}
+
+def _summary_rows(summary):
+    yield {"ID": "Total Per-Pesanan", "Jenis": "Ringkasan", "Jarak": summary["per_order_distance"],
+           "Waktu": summary["per_order_time"], "Waktu Hitung": summary["per_order_solve_time"]}
+    if summary["consolidated_distance"] is None:
+        return
+    yield {"ID": "Total Gabungan", "Jenis": "Ringkasan", "Jarak": summary["consolidated_distance"],
+           "Waktu": summary["consolidated_time"], "Batas MST": summary["lower_bound"],
+           "Gap": summary["gap"], "Waktu Hitung": summary["consolidated_solve_time"]}
+    if summary["saved_distance"] is not None:
+        yield {"ID": "Penghematan", "Jenis": "Ringkasan", "Jarak": summary["saved_distance"],
+               "Waktu": summary["saved_time"], "Hemat": summary["saved_ratio"]}
+
+def iter_export_rows(orders, routes, segments=True, groups=None, expand_route=None, analytics=None):
+    """Menghasilkan baris ekspor satu per satu (generator) dari pesanan dan rute terhitung.
+
+    `groups` memetakan kunci rute multi-drop ("multi_drop" atau "multi_drop:<dapur>") ke
+    pesanan yang dilayaninya; default semua pesanan. `expand_route(points, route, orders)`
+    mengembalikan pesanan per titik kunjungan untuk kolom Pesanan pada baris segmen
+    multi-drop. `analytics` (hasil delivery_analytics.route_analytics) mengisi kolom
+    Batas MST/Gap/Waktu Hitung dan menambahkan baris ringkasan di akhir. Pesanan tanpa
+    rute tetap diekspor dengan Jarak/Waktu kosong.
+    """
+    groups = groups or {"multi_drop": orders}
+    for key in sorted(k for k in routes if k == "multi_drop" or k.startswith("multi_drop:")):
+        points, route, total_distance, (segment_distances, segment_times), _ = routes[key]
+        group = groups.get(key, [])
+        row_id = "Multi-Drop" if key == "multi_drop" else f"Multi-Drop {points[0]['name']}"
+        row = {
+            "ID": row_id,
+            "Jenis": "Pesanan",
+            "Kurir": group[0]["courier"] if group else "N/A",
+            "Pelanggan": "Semua",
+            "Tujuan": "Semua",
+            "Pesanan": "; ".join(o["order"] for o in group),
+            "Harga": sum(o["price"] for o in group),
+            "Jarak": float(total_distance),
+            "Waktu": float(sum(segment_times)),
+            "Rute": _route_str(points, route),
+        }
+        if analytics:
+            row.update(_analytics_columns(analytics["routes"][key]))
+        yield row
+        if segments:
+            stop_orders = expand_route(points, route, group) if expand_route else None
+            yield from _segment_rows(row_id, points, route, segment_distances, segment_times, stop_orders)
+    for order in orders:
+        row = {
+            "ID": order["id"][:8],
+            "Jenis": "Pesanan",
+            "Kurir": order["courier"],
+            "Pelanggan": order["customer"],
+            "Tujuan": order["destination"],
+            "Pesanan": order["order"],
+            "Harga": order["price"],
+        }
+        if order["id"] not in routes:
+            yield row
+            continue
+        points, route, total_distance, (segment_distances, segment_times) = routes[order["id"]][:4]
+        row.update({"Jarak": float(total_distance), "Waktu": float(sum(segment_times)),
+                    "Rute": _route_str(points, route)})
+        if analytics:
+            row["Waktu Hitung"] = analytics["routes"][order["id"]]["solve_time"]
+        yield row
+        if segments:
+            yield from _segment_rows(row["ID"], points, route, segment_distances, segment_times)
+    if analytics:
+        yield from _summary_rows(analytics["summary"])
+
+def write_csv(rows, path):
+    """Menulis baris ke CSV secara streaming; memori tidak bergantung pada jumlah baris."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def _arrow_schema(pa):
+    string_columns = ["ID", "Jenis", "Kurir", "Pelanggan", "Tujuan", "Pesanan", "Rute", "Dari", "Ke"]
+    return pa.schema([(c, pa.string() if c in string_columns else
+                       pa.int32() if c == "Segmen" else pa.float64()) for c in EXPORT_COLUMNS])
+
+def _batches(rows, schema, pa, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield pa.RecordBatch.from_pylist(batch, schema=schema)
+            batch = []
+    if batch:
+        yield pa.RecordBatch.from_pylist(batch, schema=schema)
+
+def write_columnar(rows, path, batch_size=PARQUET_BATCH_SIZE):
+    """Menulis baris ke Parquet (.parquet) atau Arrow IPC (.arrow/.feather) per batch.
+
+    Membutuhkan pyarrow; memori dibatasi oleh ukuran batch.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("Ekspor Parquet/Arrow membutuhkan paket pyarrow (pip install pyarrow).")
+    schema = _arrow_schema(pa)
+    count = 0
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    try:
+        for batch in _batches(rows, schema, pa, batch_size):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    finally:
+        writer.close()
+    return count
+
+def export_rows(rows, path):
+    """Memilih format ekspor berdasarkan ekstensi file dan mengembalikan jumlah baris."""
+    if path.lower().endswith((".parquet", ".arrow", ".feather")):
+        count = write_columnar(rows, path)
+    else:
+        count = write_csv(rows, path)
+    logging.info(f"{count} baris diekspor ke {path}")
+    return count
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+
+GEOCACHE_FILE = "geocache.json"
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class GeocodeCache:
+    """Cache alamat -> koordinat yang aman dipakai banyak thread.
+
+    Permintaan untuk alamat yang sama digabung (single-flight): hanya satu thread yang
+    memanggil geocoder, thread lain menunggu hasilnya. Pemanggilan geocoder untuk alamat
+    berbeda dijalankan satu per satu lewat `fetch_lock` karena Nominatim membatasi laju
+    permintaan; pembacaan cache tidak pernah menunggu geocoder.
+    """
+    def __init__(self, entries=None):
+        self._entries = dict(entries or {})
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.fetch_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=GEOCACHE_FILE):
+        try:
+            with open(path, "r") as f:
+                return cls({address: tuple(coords) for address, coords in json.load(f).items()})
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path=GEOCACHE_FILE):
+        """Menulis cache ke file secara atomik (file sementara lalu os.replace).
+
+        Penyimpanan diserialkan dengan `_save_lock` agar salinan lama tidak menimpa
+        salinan yang lebih baru jika dua thread menyimpan bersamaan.
+        """
+        with self._save_lock:
+            with self._lock:
+                entries = dict(self._entries)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, address):
+        return address in self._entries
+
+    def __getitem__(self, address):
+        return self._entries[address]
+
+    def __setitem__(self, address, coords):
+        with self._lock:
+            self._entries[address] = coords
+
+    def get(self, address, default=None):
+        return self._entries.get(address, default)
+
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def get_or_fetch(self, address, fetch):
+        """Mengembalikan (koordinat, fetched); `fetch()` dipanggil paling banyak sekali per alamat.
+
+        `fetched` True hanya untuk thread yang benar-benar memanggil geocoder. Hasil None
+        (alamat tidak ditemukan) dan exception diteruskan ke semua penunggu tanpa di-cache.
+        """
+        with self._lock:
+            if address in self._entries:
+                return self._entries[address], False
+            flight = self._flights.get(address)
+            leader = flight is None
+            if leader:
+                flight = self._flights[address] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, False
+        try:
+            with self.fetch_lock:
+                flight.value = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.value is not None:
+                    self._entries[address] = flight.value
+                del self._flights[address]
+            flight.done.set()
+        return flight.value, True
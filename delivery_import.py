@@ -0,0 +1,70 @@
+import csv
+import json
+
+import numpy as np
+
+ORDER_FIELDS = ("id", "courier", "customer", "customer_address", "destination",
+                "destination_address", "order", "price")
+REQUIRED_FIELDS = ORDER_FIELDS[1:]
+FIELD_LABELS = {
+    "courier": "Nama kurir", "customer": "Nama pelanggan", "customer_address": "Alamat pelanggan",
+    "destination": "Tujuan pengiriman", "destination_address": "Alamat pengiriman",
+    "order": "Pesanan", "price": "Harga",
+}
+
+def iter_order_rows(path):
+    """Membaca baris pesanan dari CSV, JSON Lines (.jsonl), atau JSON satu per satu."""
+    lower = path.lower()
+    if lower.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif lower.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from (data["orders"] if isinstance(data, dict) else data)
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+
+def normalize_row(row):
+    """Merapikan satu baris: hanya kolom pesanan, nilai string dipangkas."""
+    return {field: (str(row.get(field)).strip() if row.get(field) is not None else "")
+            for field in ORDER_FIELDS}
+
+def validate_rows(rows):
+    """Memvalidasi kolom wajib, ID ganda, dan harga seluruh baris sekaligus.
+
+    Mengembalikan (prices, errors): array harga float (NaN jika tidak valid) dan
+    dict nomor baris -> daftar pesan error.
+    """
+    errors = {}
+    seen_ids = {}
+    prices = np.full(len(rows), np.nan)
+    for i, row in enumerate(rows):
+        missing = [FIELD_LABELS[f] for f in REQUIRED_FIELDS if not row[f]]
+        if missing:
+            errors.setdefault(i, []).append(f"Kolom kosong: {', '.join(missing)}")
+        if row["id"]:
+            if row["id"] in seen_ids:
+                errors.setdefault(i, []).append(f"ID ganda dengan baris {seen_ids[row['id']] + 1}")
+            seen_ids.setdefault(row["id"], i)
+        try:
+            # Sama dengan form: float() biasa, jadi "12,5" atau "12.000,00" ditolak.
+            prices[i] = float(row["price"]) if row["price"] else np.nan
+        except ValueError:
+            pass
+
+    invalid_price = ~np.isfinite(prices) | (prices < 0)
+    for i in np.flatnonzero(invalid_price):
+        if rows[i]["price"]:
+            errors.setdefault(int(i), []).append("Harga harus angka positif.")
+    return prices, errors
+
+def format_errors(errors, limit=None):
+    """Menyusun pesan error per baris (nomor baris dimulai dari 1)."""
+    lines = [f"Baris {i + 1}: {'; '.join(msgs)}" for i, msgs in sorted(errors.items())]
+    if limit is not None and len(lines) > limit:
+        lines = lines[:limit] + [f"... dan {len(lines) - limit} baris lainnya"]
+    return "\n".join(lines)
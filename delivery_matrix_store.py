@@ -0,0 +1,105 @@
+import json
+import os
+import logging
+
+import numpy as np
+
+import delivery_models as models
+
+STORE_VERSION = 1
+
+def point_key(point):
+    """Kunci titik untuk indeks matriks: koordinat dibulatkan ke 6 desimal (~0,1 m)."""
+    lat, lon = point["coords"]
+    return f"{lat:.6f},{lon:.6f}"
+
+class PointSetMatrix:
+    """Matriks jarak dan waktu tersimpan (memmap) untuk satu kumpulan titik tetap."""
+    def __init__(self, name, distance, time, index, fingerprint=None):
+        self.name = name
+        self.distance = distance
+        self.time = time
+        self.index = index
+        # Nama saja tidak cukup: kumpulan titik bisa dibuat ulang dengan nama yang sama.
+        self.fingerprint = fingerprint or f"{name}-{len(index)}"
+
+    def __len__(self):
+        return len(self.index)
+
+    def indices_for(self, points):
+        """Mengembalikan indeks baris untuk setiap titik, atau None jika ada yang tidak tersimpan."""
+        try:
+            return [self.index[point_key(p)] for p in points]
+        except KeyError:
+            return None
+
+    def _take(self, matrix, idx):
+        start = idx[0]
+        if idx == list(range(start, start + len(idx))):
+            # Indeks berurutan: cukup view dari memmap tanpa menyalin data.
+            return matrix[start:start + len(idx), start:start + len(idx)]
+        return matrix[np.ix_(idx, idx)]
+
+    def submatrix(self, points):
+        """Mengambil sub-matriks (jarak, waktu) untuk titik-titik pesanan."""
+        idx = self.indices_for(points)
+        if not idx:
+            return None, None
+        return self._take(self.distance, idx), self._take(self.time, idx)
+
+class MatrixStore:
+    """Menyimpan matriks jarak/waktu per kumpulan titik sebagai file .npy + indeks JSON."""
+    def __init__(self, directory="matrices"):
+        self.directory = directory
+
+    def _paths(self, name):
+        base = os.path.join(self.directory, name)
+        return f"{base}.dist.npy", f"{base}.time.npy", f"{base}.index.json"
+
+    def exists(self, name):
+        return all(os.path.exists(p) for p in self._paths(name))
+
+    def build(self, name, points, road_network=None):
+        """Menghitung dan menyimpan matriks lengkap untuk kumpulan titik bernama."""
+        os.makedirs(self.directory, exist_ok=True)
+        dist_path, time_path, index_path = self._paths(name)
+        n = len(points)
+        index = {}
+        for i, p in enumerate(points):
+            index.setdefault(point_key(p), i)
+
+        distance = np.lib.format.open_memmap(dist_path, mode="w+", dtype=np.float64, shape=(n, n))
+        time = np.lib.format.open_memmap(time_path, mode="w+", dtype=np.float64, shape=(n, n))
+        if road_network is not None:
+            distance[:], time[:] = road_network.matrices(points, fallback=models.calculate_distance)
+        else:
+            # Ditulis per baris agar memori tetap kecil walau kumpulan titik besar.
+            for i in range(n):
+                row = np.zeros(n)
+                for j in range(n):
+                    if i != j:
+                        row[j] = models.calculate_distance(points[i]["coords"], points[j]["coords"])
+                distance[i] = row
+                time[i] = models.calculate_travel_time(row)
+        distance.flush()
+        time.flush()
+        del distance, time
+
+        with open(index_path, "w") as f:
+            json.dump({"version": STORE_VERSION, "name": name, "size": n,
+                       "points": [{"name": p["name"], "coords": list(p["coords"])} for p in points],
+                       "index": index}, f)
+        logging.info(f"Matriks titik '{name}' disimpan: {n} titik")
+        return self.open(name)
+
+    def open(self, name):
+        """Membuka matriks tersimpan dengan memmap read-only (bisa dibagi antar proses)."""
+        dist_path, time_path, index_path = self._paths(name)
+        with open(index_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Versi matriks tidak didukung: {meta.get('version')}")
+        distance = np.load(dist_path, mmap_mode="r")
+        time = np.load(time_path, mmap_mode="r")
+        fingerprint = f"{name}-{meta['size']}-{os.stat(index_path).st_mtime_ns}"
+        return PointSetMatrix(name, distance, time, meta["index"], fingerprint)
@@ -0,0 +1,170 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+# Batas atas bucket histogram latensi (detik).
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PROFILE_ENV = "DELIVERY_PROFILE"
+
+class Histogram:
+    """Histogram latensi dengan bucket tetap, ringan untuk dipakai di produksi."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def snapshot(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {"count": self.count, "sum": self.total, "max": self.max,
+                "mean": self.total / self.count if self.count else 0.0,
+                "buckets": dict(zip(labels, self.counts))}
+
+class Metrics:
+    """Registri counter dan histogram latensi dalam proses."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Mengukur durasi blok `with` ke histogram `name` (dan memprofilnya jika diminta)."""
+        start = time.perf_counter()
+        try:
+            with maybe_profile(name):
+                yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Dekorator untuk mengukur durasi setiap pemanggilan fungsi."""
+        def decorator(func):
+            # functools.wraps juga menyalin __qualname__ agar fungsi tetap bisa di-pickle
+            # (dikirim ke ProcessPoolExecutor).
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Mengembalikan salinan semua counter dan ringkasan histogram."""
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "histograms": {name: h.snapshot() for name, h in self.histograms.items()}}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+metrics = Metrics()
+
+@contextmanager
+def profile(output=None, sort="cumulative", limit=30):
+    """Menjalankan cProfile pada blok `with`.
+
+    Hasil disimpan ke `output` (.prof, bisa dibuka dengan snakeviz/pstats) atau,
+    jika tidak diberikan, ringkasan teks disimpan di atribut `text` objek yang di-yield.
+    """
+    result = type("ProfileResult", (), {"text": None, "stats": None})()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        if output:
+            profiler.dump_stats(output)
+        stream = io.StringIO()
+        result.stats = pstats.Stats(profiler, stream=stream).sort_stats(sort)
+        result.stats.print_stats(limit)
+        result.text = stream.getvalue()
+
+@contextmanager
+def maybe_profile(stage):
+    """Memprofil tahap `stage` jika namanya tercantum di variabel lingkungan DELIVERY_PROFILE.
+
+    Nama di DELIVERY_PROFILE juga cocok sebagai awalan bertitik: "solve" mencakup
+    "solve.order" dan "solve.multi_drop". Contoh: DELIVERY_PROFILE=solve,matrix menulis
+    profile_solve.order.prof, profile_solve.multi_drop.prof, dan profile_matrix.prof.
+    """
+    stages = os.environ.get(PROFILE_ENV, "")
+    if stages == "all" or any(stage == name or stage.startswith(f"{name}.")
+                              for name in stages.split(",") if name):
+        with profile(f"profile_{stage}.prof"):
+            yield
+    else:
+        yield
+
+class Sampler:
+    """Profiler sampling sederhana: mencatat fungsi yang sedang berjalan di thread target.
+
+    Overhead kecil sehingga aman dinyalakan sementara di produksi:
+        with Sampler() as sampler:
+            ...
+        print(sampler.top())
+    """
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            while frame is not None:
+                code = frame.f_code
+                self.samples[(code.co_filename, code.co_name, frame.f_lineno)] += 1
+                frame = frame.f_back
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def top(self, limit=20):
+        """Lokasi kode yang paling sering muncul dalam sampel (termasuk pemanggil)."""
+        return [(f"{os.path.basename(f)}:{line} {name}", count)
+                for (f, name, line), count in self.samples.most_common(limit)]
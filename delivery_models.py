@@ -1,8 +1,15 @@
-import numpy as np
-from geopy.distance import geodesic
-from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+from itertools import permutations
+
+from delivery_metrics import metrics
+
+# numpy, geopy, dan ortools diimpor saat pertama dipakai agar aplikasi cepat terbuka.
 
 AVERAGE_SPEED = 30  # km/jam
+# Bobot durasi tur dalam biaya solver: 1 detik setara 1 meter jarak.
+TIME_COST_PER_SECOND = 1
+# Sampai jumlah titik ini rute satu kendaraan dicari dengan enumerasi (7! = 5040 urutan).
+EXACT_MAX_POINTS = 8
+COORD_PRECISION = 4  # desimal derajat, ~11 m
 CIREBON_BOUNDS = {
     "lat_min": -6.9,
     "lat_max": -6.5,
@@ -15,22 +22,69 @@ def validate_coords(lat, lon):
     return (CIREBON_BOUNDS["lat_min"] <= lat <= CIREBON_BOUNDS["lat_max"] and
             CIREBON_BOUNDS["lon_min"] <= lon <= CIREBON_BOUNDS["lon_max"])
 
+def location_key(coords, precision=COORD_PRECISION):
+    """Kunci lokasi dari koordinat yang dibulatkan; alamat dengan kunci sama menjadi satu titik rute."""
+    return round(coords[0], precision), round(coords[1], precision)
+
+def validate_coords_array(lats, lons):
+    """Versi vektor dari validate_coords untuk banyak koordinat sekaligus (NaN dianggap tidak valid)."""
+    import numpy as np
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return ((lats >= CIREBON_BOUNDS["lat_min"]) & (lats <= CIREBON_BOUNDS["lat_max"]) &
+            (lons >= CIREBON_BOUNDS["lon_min"]) & (lons <= CIREBON_BOUNDS["lon_max"]))
+
 def calculate_distance(coord1, coord2):
     """Menghitung jarak antar dua koordinat dalam kilometer."""
+    from geopy.distance import geodesic
     return geodesic(coord1, coord2).kilometers
 
 def calculate_travel_time(distance_km, speed_kmh=AVERAGE_SPEED):
     """Menghitung waktu tempuh dalam menit berdasarkan jarak."""
     return (distance_km / speed_kmh) * 60
 
-def create_distance_matrix(points):
-    """Membuat matriks jarak antar semua titik."""
+@metrics.timed("matrix")
+def create_matrices(points, road_network=None, point_matrix=None):
+    """Membuat matriks jarak antar semua titik beserta matriks waktu jika tersedia.
+
+    Jika `point_matrix` (PointSetMatrix dari delivery_matrix_store) memuat semua titik,
+    sub-matriks jarak dan waktunya diambil langsung tanpa dihitung ulang. Jika `road_network` (RoadNetwork
+    dari delivery_roadnet) diberikan, jarak dan waktu dihitung melalui jaringan jalan; jika
+    tidak, memakai jarak geodesik garis lurus dan waktu None (dihitung dari profil kecepatan).
+    Mengembalikan (matriks jarak, matriks waktu atau None).
+    """
+    if point_matrix is not None:
+        distance_matrix, time_matrix = point_matrix.submatrix(points)
+        if distance_matrix is not None:
+            return distance_matrix, time_matrix
+    if road_network is not None:
+        return road_network.matrices(points, fallback=calculate_distance)
+    import numpy as np
     n = len(points)
     matrix = np.zeros((n, n))
     for i in range(n):
         for j in range(n):
             if i != j:
                 matrix[i][j] = calculate_distance(points[i]["coords"], points[j]["coords"])
+    return matrix, None
+
+def create_distance_matrix(points, road_network=None, point_matrix=None):
+    """Membuat matriks jarak antar semua titik (lihat create_matrices)."""
+    return create_matrices(points, road_network, point_matrix)[0]
+
+@metrics.timed("matrix")
+def create_cost_matrix(origins, targets, road_network=None):
+    """Membuat matriks jarak persegi panjang (len(origins) x len(targets)), baris = asal.
+
+    Dengan graf jalan, pencarian hanya dijalankan dari titik asal (mis. dapur) ke target.
+    """
+    import numpy as np
+    if road_network is not None:
+        return road_network.cost_matrices(origins, targets, fallback=calculate_distance)[0]
+    matrix = np.zeros((len(origins), len(targets)))
+    for i, origin in enumerate(origins):
+        for j, target in enumerate(targets):
+            matrix[i][j] = calculate_distance(origin["coords"], target["coords"])
     return matrix
 
 class UnionFind:
@@ -55,12 +109,26 @@ class UnionFind:
             self.rank[px] += 1
         return True
 
-def kruskal_mst(points, distance_matrix):
-    """Membuat Minimum Spanning Tree dengan algoritma Kruskal."""
+@metrics.timed("mst")
+def kruskal_mst(points, distance_matrix, candidate_edges=None):
+    """Membuat Minimum Spanning Tree dengan algoritma Kruskal.
+
+    Jika `candidate_edges` (pasangan (i, j), mis. dari delivery_spatial.candidate_edges)
+    diberikan, hanya sisi tersebut yang diurutkan. Hasilnya pohon rentang yang mendekati
+    minimum; jika sisi kandidat tidak menghubungkan semua titik, dipakai semua sisi.
+    """
     n = len(points)
+    if candidate_edges is not None:
+        edges = sorted((distance_matrix[i][j], i, j) for i, j in candidate_edges)
+        mst_edges, total_weight = _kruskal(n, edges)
+        if len(mst_edges) == n - 1:
+            return mst_edges, total_weight
     edges = [(distance_matrix[i][j], i, j) for i in range(n) for j in range(i + 1, n)]
     edges.sort()
+    return _kruskal(n, edges)
 
+def _kruskal(n, edges):
+    """Kruskal pada daftar sisi (bobot, u, v) yang sudah terurut."""
     uf = UnionFind(n)
     mst_edges = []
     total_weight = 0
@@ -72,8 +140,89 @@ def kruskal_mst(points, distance_matrix):
 
     return mst_edges, total_weight
 
-def find_shortest_route(distance_matrix, num_vehicles=1, start_idx=0):
-    """Mencari rute terpendek untuk satu pesanan menggunakan OR-Tools."""
+def segment_stats(route, distance_matrix, time_matrix=None):
+    """Menghitung jarak dan waktu tiap ruas rute.
+
+    Waktu diambil dari `time_matrix` (menit) jika ada, selain itu dari AVERAGE_SPEED.
+    """
+    segment_distances = []
+    segment_times = []
+    for i in range(len(route) - 1):
+        dist = distance_matrix[route[i]][route[i + 1]]
+        segment_distances.append(dist)
+        if time_matrix is not None:
+            segment_times.append(time_matrix[route[i]][route[i + 1]])
+        else:
+            segment_times.append(calculate_travel_time(dist))
+    return segment_distances, segment_times
+
+def add_time_dimension(routing, manager, time_matrix):
+    """Menambahkan dimensi waktu (menit x 60 = detik) ke model OR-Tools.
+
+    Durasi tur ikut menjadi biaya (span cost, TIME_COST_PER_SECOND per detik di samping
+    biaya jarak per meter), jadi solver memilih jalan yang lebih cepat pada jam sibuk.
+    Kapasitas dimensi adalah batas atas durasi tur (jumlah titik x ruas terlama), bukan
+    batas 24 jam, sehingga tur panjang tetap feasible.
+    """
+    import numpy as np
+    seconds = np.rint(np.asarray(time_matrix, dtype=np.float64) * 60).astype(np.int64).tolist()
+
+    def time_callback(from_index, to_index):
+        return seconds[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+    horizon = max(1, max(max(row) for row in seconds) * len(seconds))
+    time_callback_index = routing.RegisterTransitCallback(time_callback)
+    routing.AddDimension(time_callback_index, 0, horizon, True, "Time")
+    dimension = routing.GetDimensionOrDie("Time")
+    dimension.SetGlobalSpanCostCoefficient(TIME_COST_PER_SECOND)
+    return dimension
+
+def read_route(routing, manager, next_index, distance_matrix, start_idx=0):
+    """Membaca rute kendaraan 0 dan total jaraknya; `next_index(i)` memberi indeks berikutnya."""
+    route = []
+    total_distance = 0
+    index = routing.Start(0)
+    while not routing.IsEnd(index):
+        route.append(manager.IndexToNode(index))
+        index = next_index(index)
+        if not routing.IsEnd(index):
+            total_distance += distance_matrix[route[-1]][manager.IndexToNode(index)]
+    route.append(start_idx)
+    total_distance += distance_matrix[route[-2]][start_idx]
+    return route, total_distance
+
+def exact_route(distance_matrix, start_idx=0, time_matrix=None):
+    """Rute optimal satu kendaraan dengan mencoba semua urutan (hanya untuk sedikit titik).
+
+    Biayanya sama dengan model OR-Tools: meter jarak ditambah TIME_COST_PER_SECOND per
+    detik durasi tur jika ada matriks waktu.
+    """
+    n = len(distance_matrix)
+    cost = [[int(distance_matrix[i][j] * 1000) for j in range(n)] for i in range(n)]
+    if time_matrix is not None:
+        for i in range(n):
+            for j in range(n):
+                cost[i][j] += TIME_COST_PER_SECOND * int(round(time_matrix[i][j] * 60))
+    best_route, best_cost = None, None
+    for order in permutations([i for i in range(n) if i != start_idx]):
+        route = [start_idx, *order, start_idx]
+        total = sum(cost[a][b] for a, b in zip(route, route[1:]))
+        if best_cost is None or total < best_cost:
+            best_route, best_cost = route, total
+    total_distance = sum(distance_matrix[a][b] for a, b in zip(best_route, best_route[1:]))
+    return best_route, total_distance
+
+@metrics.timed("solve.order")
+def find_shortest_route(distance_matrix, num_vehicles=1, start_idx=0, time_matrix=None, time_limit=10):
+    """Mencari rute terpendek untuk satu pesanan menggunakan OR-Tools.
+
+    Rute satu kendaraan dengan paling banyak EXACT_MAX_POINTS titik (kasus satu pesanan)
+    diselesaikan langsung dengan exact_route, tanpa menunggu batas waktu GLS.
+    """
+    if num_vehicles == 1 and len(distance_matrix) <= EXACT_MAX_POINTS:
+        route, total_distance = exact_route(distance_matrix, start_idx, time_matrix)
+        return route, total_distance, segment_stats(route, distance_matrix, time_matrix)
+    from ortools.constraint_solver import pywrapcp, routing_enums_pb2
     manager = pywrapcp.RoutingIndexManager(len(distance_matrix), num_vehicles, start_idx)
     routing = pywrapcp.RoutingModel(manager)
 
@@ -84,41 +233,34 @@ def find_shortest_route(distance_matrix, num_vehicles=1, start_idx=0):
 
     transit_callback_index = routing.RegisterTransitCallback(distance_callback)
     routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+    if time_matrix is not None:
+        add_time_dimension(routing, manager, time_matrix)
 
     search_parameters = pywrapcp.DefaultRoutingSearchParameters()
     search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
     search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-    search_parameters.time_limit.seconds = 10
+    search_parameters.time_limit.seconds = time_limit
 
     solution = routing.SolveWithParameters(search_parameters)
     if not solution:
         return None, None, None
 
-    route = []
-    total_distance = 0
-    index = routing.Start(0)
-    while not routing.IsEnd(index):
-        route.append(manager.IndexToNode(index))
-        previous_index = index
-        index = solution.Value(routing.NextVar(index))
-        if not routing.IsEnd(index):
-            total_distance += distance_matrix[route[-1]][manager.IndexToNode(index)]
-    route.append(start_idx)
-    total_distance += distance_matrix[route[-2]][start_idx]
-    
-    segment_distances = []
-    segment_times = []
-    for i in range(len(route) - 1):
-        dist = distance_matrix[route[i]][route[i + 1]]
-        segment_distances.append(dist)
-        segment_times.append(calculate_travel_time(dist))
-    
-    return route, total_distance, (segment_distances, segment_times)
+    route, total_distance = read_route(
+        routing, manager, lambda i: solution.Value(routing.NextVar(i)), distance_matrix, start_idx)
+    return route, total_distance, segment_stats(route, distance_matrix, time_matrix)
+
+@metrics.timed("solve.multi_drop")
+def find_multi_drop_route(points, distance_matrix, max_stops=10, time_matrix=None, time_limit=10,
+                          candidate_edges=None, on_solution=None, cancel_event=None):
+    """Mencari rute multi-drop untuk semua pesanan.
 
-def find_multi_drop_route(points, distance_matrix, max_stops=10):
-    """Mencari rute multi-drop untuk semua pesanan."""
-    mst_edges, _ = kruskal_mst(points, distance_matrix)
+    Mode anytime: `on_solution(route, total_distance, segments, mst_edges)` dipanggil setiap
+    solver menemukan solusi yang lebih baik, dan pencarian berhenti lebih awal jika
+    `cancel_event` (threading.Event) di-set; hasilnya tetap solusi terbaik sejauh ini.
+    """
+    mst_edges, _ = kruskal_mst(points, distance_matrix, candidate_edges)
     
+    from ortools.constraint_solver import pywrapcp, routing_enums_pb2
     manager = pywrapcp.RoutingIndexManager(len(distance_matrix), 1, 0)
     routing = pywrapcp.RoutingModel(manager)
 
@@ -131,33 +273,32 @@ def find_multi_drop_route(points, distance_matrix, max_stops=10):
     routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
 
     routing.AddConstantDimension(1, max_stops, True, "Stops")
+    if time_matrix is not None:
+        add_time_dimension(routing, manager, time_matrix)
 
     search_parameters = pywrapcp.DefaultRoutingSearchParameters()
     search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
     search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-    search_parameters.time_limit.seconds = 10
+    search_parameters.time_limit.seconds = time_limit
+
+    if on_solution is not None:
+        best = [float("inf")]
+
+        def publish():
+            # Guided local search juga menerima solusi yang lebih buruk; hanya perbaikan yang dikirim.
+            route, total_distance = read_route(
+                routing, manager, lambda i: routing.NextVar(i).Value(), distance_matrix)
+            if total_distance < best[0] - 1e-9:
+                best[0] = total_distance
+                on_solution(route, total_distance, segment_stats(route, distance_matrix, time_matrix), mst_edges)
+        routing.AddAtSolutionCallback(publish)
+    if cancel_event is not None:
+        routing.AddSearchMonitor(routing.solver().CustomLimit(cancel_event.is_set))
 
     solution = routing.SolveWithParameters(search_parameters)
     if not solution:
         return None, None, None, None
 
-    route = []
-    total_distance = 0
-    index = routing.Start(0)
-    while not routing.IsEnd(index):
-        route.append(manager.IndexToNode(index))
-        previous_index = index
-        index = solution.Value(routing.NextVar(index))
-        if not routing.IsEnd(index):
-            total_distance += distance_matrix[route[-1]][manager.IndexToNode(index)]
-    route.append(0)
-    total_distance += distance_matrix[route[-2]][0]
-
-    segment_distances = []
-    segment_times = []
-    for i in range(len(route) - 1):
-        dist = distance_matrix[route[i]][route[i + 1]]
-        segment_distances.append(dist)
-        segment_times.append(calculate_travel_time(dist))
-
-    return route, total_distance, (segment_distances, segment_times), mst_edges
\ No newline at end of file
+    route, total_distance = read_route(
+        routing, manager, lambda i: solution.Value(routing.NextVar(i)), distance_matrix)
+    return route, total_distance, segment_stats(route, distance_matrix, time_matrix), mst_edges
\ No newline at end of file
@@ -0,0 +1,272 @@
+import json
+import os
+import sys
+import logging
+import math
+import zlib
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# Kecepatan rata-rata per jenis jalan OSM (km/jam), dipakai untuk bobot waktu.
+HIGHWAY_SPEEDS = {
+    "motorway": 60, "trunk": 50, "primary": 40, "secondary": 35,
+    "tertiary": 30, "unclassified": 25, "residential": 20,
+    "living_street": 10, "service": 15,
+    "motorway_link": 40, "trunk_link": 35, "primary_link": 30,
+    "secondary_link": 30, "tertiary_link": 25,
+}
+GRAPH_FILES = ("node_lat", "node_lon", "indptr", "indices", "length_km", "time_min")
+GRAPH_VERSION = 1
+# Ukuran sel indeks grid untuk mencari simpul terdekat.
+NODE_GRID_KM = 0.25
+# Batas jumlah sel (sumber x simpul) matriks label pencarian banyak-ke-banyak.
+SEARCH_CELLS = 4_000_000
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Jarak lingkaran besar (km) dalam bentuk vektor, cukup akurat untuk panjang ruas jalan."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 6371.0088 * 2 * np.arcsin(np.sqrt(a))
+
+def build_graph_from_osm(osm_path, bounds=None):
+    """Membaca ekstrak OSM (.osm XML) dan membuat graf jalan dalam format CSR."""
+    node_coords = {}
+    ways = []
+    for _, elem in ET.iterparse(osm_path, events=("end",)):
+        if elem.tag == "node":
+            lat, lon = float(elem.get("lat")), float(elem.get("lon"))
+            if bounds is None or (bounds["lat_min"] <= lat <= bounds["lat_max"] and
+                                  bounds["lon_min"] <= lon <= bounds["lon_max"]):
+                node_coords[int(elem.get("id"))] = (lat, lon)
+            elem.clear()
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.findall("tag")}
+            highway = tags.get("highway")
+            if highway in HIGHWAY_SPEEDS:
+                refs = [int(nd.get("ref")) for nd in elem.findall("nd")]
+                oneway = tags.get("oneway") in ("yes", "1", "true") or highway == "motorway"
+                ways.append((refs, HIGHWAY_SPEEDS[highway], oneway))
+            elem.clear()
+
+    osm_to_idx = {}
+    src, dst, speeds = [], [], []
+    for refs, speed, oneway in ways:
+        for a, b in zip(refs, refs[1:]):
+            if a not in node_coords or b not in node_coords:
+                continue
+            ia = osm_to_idx.setdefault(a, len(osm_to_idx))
+            ib = osm_to_idx.setdefault(b, len(osm_to_idx))
+            src.append(ia); dst.append(ib); speeds.append(speed)
+            if not oneway:
+                src.append(ib); dst.append(ia); speeds.append(speed)
+
+    coords = np.empty((len(osm_to_idx), 2))
+    for osm_id, idx in osm_to_idx.items():
+        coords[idx] = node_coords[osm_id]
+    src = np.asarray(src, dtype=np.int32)
+    dst = np.asarray(dst, dtype=np.int32)
+    length_km = _haversine_km(coords[src, 0], coords[src, 1], coords[dst, 0], coords[dst, 1])
+    time_min = length_km / np.asarray(speeds, dtype=np.float64) * 60
+
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(len(coords) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(coords)), out=indptr[1:])
+    logging.info(f"Graf jalan dibuat: {len(coords)} simpul, {len(src)} ruas")
+    return RoadNetwork(coords[:, 0].copy(), coords[:, 1].copy(), indptr,
+                       dst[order], length_km[order], time_min[order])
+
+class RoadNetwork:
+    """Graf jalan (CSR) untuk menghitung matriks jarak dan waktu tempuh melalui jalan."""
+    def __init__(self, node_lat, node_lon, indptr, indices, length_km, time_min):
+        self.node_lat = node_lat
+        self.node_lon = node_lon
+        self.indptr = indptr
+        self.indices = indices
+        self.length_km = length_km
+        self.time_min = time_min
+        self._grid = None
+        self._fingerprint = None
+
+    @property
+    def num_nodes(self):
+        return len(self.node_lat)
+
+    def save(self, directory):
+        """Menyimpan graf sebagai file .npy terpisah agar bisa dibuka dengan memmap."""
+        os.makedirs(directory, exist_ok=True)
+        for name in GRAPH_FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"version": GRAPH_VERSION, "nodes": self.num_nodes,
+                       "edges": int(len(self.indices))}, f)
+        logging.info(f"Graf jalan disimpan: {directory}")
+
+    @property
+    def fingerprint(self):
+        """Identitas isi graf (versi, ukuran, dan CRC32 array) untuk kunci cache matriks."""
+        if self._fingerprint is None:
+            crc = 0
+            for name in GRAPH_FILES:
+                crc = zlib.crc32(np.ascontiguousarray(getattr(self, name)).tobytes(), crc)
+            self._fingerprint = f"graph{GRAPH_VERSION}-{self.num_nodes}-{len(self.indices)}-{crc:08x}"
+        return self._fingerprint
+
+    @classmethod
+    def load(cls, directory):
+        """Membuka graf tersimpan tanpa menyalin isinya ke RAM (mmap_mode='r')."""
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != GRAPH_VERSION:
+            raise ValueError(f"Versi graf tidak didukung: {meta.get('version')}")
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                  for name in GRAPH_FILES}
+        return cls(**arrays)
+
+    def _node_grid(self):
+        """Indeks grid simpul (dibuat sekali, vektor numpy): sel -> simpul urut per sel."""
+        if self._grid is None:
+            lat0 = math.radians(float(np.mean(self.node_lat)))
+            kx, ky = 111.32 * math.cos(lat0) / NODE_GRID_KM, 111.32 / NODE_GRID_KM
+            gx = np.floor(np.asarray(self.node_lon) * kx).astype(np.int64)
+            gy = np.floor(np.asarray(self.node_lat) * ky).astype(np.int64)
+            x0, y0 = int(gx.min()), int(gy.min())
+            width, height = int(gx.max()) - x0 + 1, int(gy.max()) - y0 + 1
+            cells = (gx - x0) * height + (gy - y0)
+            order = np.argsort(cells, kind="stable")
+            self._grid = (kx, ky, x0, y0, width, height, cells[order], order)
+        return self._grid
+
+    def _grid_candidates(self, gx, gy, r):
+        """Simpul di dalam persegi (2r+1) x (2r+1) sel di sekitar sel (gx, gy)."""
+        _, _, _, _, width, height, cells, order = self._grid
+        ylo, yhi = max(gy - r, 0), min(gy + r, height - 1)
+        parts = []
+        if ylo <= yhi:
+            for x in range(max(gx - r, 0), min(gx + r, width - 1) + 1):
+                lo = np.searchsorted(cells, x * height + ylo, side="left")
+                hi = np.searchsorted(cells, x * height + yhi, side="right")
+                if hi > lo:
+                    parts.append(order[lo:hi])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def nearest_nodes(self, coords):
+        """Mencari simpul graf terdekat untuk setiap koordinat lewat indeks grid.
+
+        Persegi sel diperluas sampai simpul terdekat yang ditemukan lebih dekat daripada
+        tepi persegi, jadi hasilnya sama dengan pencarian ke semua simpul.
+        """
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        kx, ky, x0, y0, width, height, _, _ = self._node_grid()
+        nearest = np.empty(len(coords), dtype=np.int64)
+        snap_km = np.empty(len(coords))
+        for i, (lat, lon) in enumerate(coords):
+            gx, gy = int(math.floor(lon * kx)) - x0, int(math.floor(lat * ky)) - y0
+            max_r = max(abs(gx), abs(gy), abs(width - gx), abs(height - gy)) + 1
+            for r in range(max_r + 1):
+                candidates = self._grid_candidates(gx, gy, r)
+                if not len(candidates):
+                    continue
+                d = _haversine_km(lat, lon, self.node_lat[candidates], self.node_lon[candidates])
+                k = int(np.argmin(d))
+                nearest[i], snap_km[i] = candidates[k], d[k]
+                # Simpul di luar persegi berjarak minimal r sel (margin untuk galat proyeksi).
+                if d[k] <= r * NODE_GRID_KM * 0.99:
+                    break
+        return nearest, snap_km
+
+    def _many_to_many(self, sources, targets):
+        """Jarak terpendek (bobot panjang) dari setiap sumber ke setiap target sekaligus.
+
+        Label-correcting bertingkat yang divektorkan dengan numpy: setiap putaran
+        merelaksasi ruas keluar dari semua simpul yang baru membaik, untuk semua sumber
+        bersamaan. Simpul yang sudah lebih jauh dari target terjauh (untuk sumber itu)
+        tidak diperluas lagi, jadi pencarian berhenti di radius target. Waktu tempuh
+        dijumlahkan sepanjang jalur terpendek yang sama. Mengembalikan dua array
+        len(sources) x len(targets); np.inf untuk target yang tidak tercapai.
+        """
+        indptr, indices = np.asarray(self.indptr), np.asarray(self.indices)
+        length_km, time_min = np.asarray(self.length_km), np.asarray(self.time_min)
+        num_nodes = len(indptr) - 1
+        targets = np.asarray(targets, dtype=np.int64)
+        rows = np.arange(len(sources))
+        dist = np.full((len(sources), num_nodes), np.inf)
+        elapsed = np.full((len(sources), num_nodes), np.inf)
+        flat_dist, flat_elapsed = dist.reshape(-1), elapsed.reshape(-1)
+        dist[rows, sources] = 0.0
+        elapsed[rows, sources] = 0.0
+        front_rows, front_nodes = rows, np.asarray(sources, dtype=np.int64)
+        while len(front_nodes):
+            front_dist = dist[front_rows, front_nodes]
+            keep = front_dist < dist[:, targets].max(axis=1)[front_rows]
+            front_rows, front_nodes, front_dist = front_rows[keep], front_nodes[keep], front_dist[keep]
+            starts = indptr[front_nodes]
+            counts = indptr[front_nodes + 1] - starts
+            offsets = np.cumsum(counts) - counts
+            edges = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+            edge_rows = np.repeat(front_rows, counts)
+            new_dist = np.repeat(front_dist, counts) + length_km[edges]
+            new_elapsed = np.repeat(elapsed[front_rows, front_nodes], counts) + time_min[edges]
+            keys = edge_rows * num_nodes + indices[edges]
+            better = new_dist < flat_dist[keys]
+            keys, new_dist, new_elapsed = keys[better], new_dist[better], new_elapsed[better]
+            np.minimum.at(flat_dist, keys, new_dist)
+            won = new_dist == flat_dist[keys]
+            flat_elapsed[keys[won]] = new_elapsed[won]
+            front_rows, front_nodes = np.divmod(np.unique(keys[won]), num_nodes)
+        return dist[:, targets], elapsed[:, targets]
+
+    def cost_matrices(self, origins, targets, fallback=None):
+        """Matriks jarak (km) dan waktu (menit) len(origins) x len(targets) melalui jalan.
+
+        Semua simpul asal dicari bersamaan dan pencarian berhenti di radius target
+        terjauh. Pasangan yang tidak terhubung di graf memakai `fallback(coord1, coord2)`
+        jika diberikan.
+        """
+        origin_coords = [p["coords"] for p in origins]
+        target_coords = [p["coords"] for p in targets]
+        origin_nodes, origin_snap = self.nearest_nodes(origin_coords)
+        target_nodes, target_snap = self.nearest_nodes(target_coords)
+        dist_matrix = np.zeros((len(origins), len(targets)))
+        time_matrix = np.zeros((len(origins), len(targets)))
+        if not len(origins) or not len(targets):
+            return dist_matrix, time_matrix
+        access_speed = HIGHWAY_SPEEDS["residential"]
+        unique_targets, target_pos = np.unique(target_nodes, return_inverse=True)
+        unique_sources, source_pos = np.unique(origin_nodes, return_inverse=True)
+        # Sumber diproses per kelompok agar matriks label tetap berukuran wajar.
+        chunk = max(1, SEARCH_CELLS // max(1, self.num_nodes))
+        parts = [self._many_to_many(unique_sources[k:k + chunk], unique_targets)
+                 for k in range(0, len(unique_sources), chunk)]
+        by_length = np.vstack([length for length, _ in parts])
+        by_time = np.vstack([time for _, time in parts])
+        for source in range(len(unique_sources)):
+            row_length = by_length[source][target_pos]
+            row_time = by_time[source][target_pos]
+            unreachable = np.flatnonzero(np.isinf(row_length))
+            for i in np.flatnonzero(source_pos == source):
+                # Jarak "snap" ke simpul terdekat dihitung sebagai jalan kaki/akses lokal.
+                access = origin_snap[i] + target_snap
+                dist_matrix[i] = row_length + access
+                time_matrix[i] = row_time + access / access_speed * 60
+                if fallback is not None:
+                    for j in unreachable:
+                        dist_matrix[i][j] = fallback(origin_coords[i], target_coords[j])
+                        time_matrix[i][j] = dist_matrix[i][j] / access_speed * 60
+        return dist_matrix, time_matrix
+
+    def matrices(self, points, fallback=None):
+        """Membuat matriks jarak (km) dan waktu (menit) antar titik melalui jaringan jalan."""
+        dist_matrix, time_matrix = self.cost_matrices(points, points, fallback)
+        np.fill_diagonal(dist_matrix, 0.0)
+        np.fill_diagonal(time_matrix, 0.0)
+        return dist_matrix, time_matrix
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Penggunaan: python delivery_roadnet.py <ekstrak.osm> <folder_graf>")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    from delivery_models import CIREBON_BOUNDS
+    build_graph_from_osm(sys.argv[1], CIREBON_BOUNDS).save(sys.argv[2])
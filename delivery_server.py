@@ -0,0 +1,319 @@
+"""Layanan HTTP/JSON untuk geocoding dan perhitungan rute.
+
+Contoh:
+    python delivery_server.py --port 8080 --workers 4 --point-set cirebon
+
+Endpoint (semua POST, body JSON, field "tenant" opsional, default "default"):
+    /geocode           {"address"}
+    /depot             {"name", "address"}
+    /orders            {"id", "courier", "customer", "customer_address", "destination",
+                        "destination_address", "order", "price"}
+    /route/order       {"id"}
+    /route/multi-drop  {}
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import delivery_models as models
+from delivery_analytics import timed_call
+from delivery_controller import DeliveryController
+from delivery_metrics import metrics
+
+MAX_BODY_BYTES = 1024 * 1024
+MATRIX_CACHE_SIZE = 1024
+MAX_TENANTS = 256
+TENANT_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+ORDER_FIELDS = ("id", "courier", "customer", "customer_address", "destination",
+                "destination_address", "order", "price")
+HTTP_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable", 504: "Gateway Timeout"}
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class RoutingService:
+    """Menyimpan state dapur/titik per tenant dan berbagi cache geocode serta matriks jarak."""
+    def __init__(self, output_dir="tenants", workers=None, max_pending=32, timeout=30, point_set=None,
+                 max_tenants=MAX_TENANTS):
+        self.output_dir = output_dir
+        self.max_tenants = max_tenants
+        # spawn: proses solver tidak mewarisi thread dan lock dari event loop lewat fork.
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.pending = asyncio.Semaphore(max_pending)
+        self.timeout = timeout
+        self.tenants = {}
+        self._tenant_lock = threading.Lock()
+        self.matrix_cache = OrderedDict()
+        self._matrix_lock = threading.Lock()
+        self._shared = DeliveryController(output_dir=output_dir, open_browser=False)
+        if point_set:
+            success, message = self._shared.use_point_set(point_set)
+            if not success:
+                raise ValueError(message)
+
+    def tenant(self, name):
+        """Mengambil (atau membuat) controller tenant yang berbagi cache dengan tenant lain.
+
+        Controller aman dipakai bersamaan: penulisan memakai copy-on-write di bawah lock
+        controller, pembaca rute memakai snapshot, dan cache geocode bersama bersifat
+        single-flight, jadi permintaan tidak perlu diserialkan di sini. Tenant baru
+        dibuat dari cache bersama (tanpa membaca geocache/jaringan jalan lagi) dan
+        jumlahnya dibatasi `max_tenants`; nama tenant juga dipakai sebagai nama folder.
+        """
+        if not isinstance(name, str) or not TENANT_NAME.fullmatch(name):
+            raise RequestError(400, "Nama tenant hanya boleh huruf, angka, '-' dan '_' (maks. 64).")
+        with self._tenant_lock:
+            if name not in self.tenants:
+                if len(self.tenants) >= self.max_tenants:
+                    raise RequestError(503, "Jumlah tenant sudah mencapai batas.")
+                self.tenants[name] = DeliveryController(
+                    output_dir=os.path.join(self.output_dir, name), open_browser=False, shared=self._shared)
+            return self.tenants[name]
+
+    def matrices(self, controller, points):
+        """Matriks jarak dan waktu dengan cache bersama antar permintaan, berdasarkan koordinat titik.
+
+        Waktu dari graf jalan (jika ada) ikut di-cache; waktu tempuh akhir dihitung dari
+        profil kecepatan untuk jam keberangkatan controller. Dipanggil lewat
+        `compute_matrices` di thread pool, jadi cache dijaga dengan lock.
+        """
+        key = (controller.matrix_source(), tuple(tuple(p["coords"]) for p in points))
+        with self._matrix_lock:
+            matrices = self.matrix_cache.get(key)
+            if matrices is not None:
+                self.matrix_cache.move_to_end(key)
+        if matrices is None:
+            matrices = models.create_matrices(points, controller.road_network, controller.point_matrix)
+            with self._matrix_lock:
+                self.matrix_cache[key] = matrices
+                if len(self.matrix_cache) > MATRIX_CACHE_SIZE:
+                    self.matrix_cache.popitem(last=False)
+        distance_matrix, base_time = matrices
+        time_matrix = controller.speed_profile.time_matrix(
+            points, distance_matrix, controller.departure_hour, base_time)
+        return distance_matrix, time_matrix
+
+    async def compute_matrices(self, controller, points):
+        """Menghitung matriks di thread pool agar event loop tidak terblokir."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.matrices, controller, points)
+
+    async def geocode(self, body):
+        controller = self.tenant(body.get("tenant", "default"))
+        if not body.get("address"):
+            raise RequestError(400, "Field 'address' harus diisi.")
+        loop = asyncio.get_running_loop()
+        coords = await loop.run_in_executor(None, controller.geocode_address, body["address"])
+        if not coords or coords[0] is None:
+            raise RequestError(404, "Alamat tidak ditemukan.")
+        return {"coords": list(coords)}
+
+    async def set_depot(self, body):
+        controller = self.tenant(body.get("tenant", "default"))
+        loop = asyncio.get_running_loop()
+        success, message = await loop.run_in_executor(
+            None, controller.set_depot, body.get("name"), body.get("address"))
+        if not success:
+            raise RequestError(400, message)
+        return {"message": message, "depot": controller.depot}
+
+    async def add_order(self, body):
+        controller = self.tenant(body.get("tenant", "default"))
+        values = validate_order(body)
+        loop = asyncio.get_running_loop()
+        success, message = await loop.run_in_executor(None, controller.add_or_update_order, *values)
+        if not success:
+            raise RequestError(400, message)
+        return {"message": message, "orders": len(controller.orders)}
+
+    async def route_order(self, body):
+        controller = self.tenant(body.get("tenant", "default"))
+        state = controller.snapshot()
+        if not state.depots:
+            raise RequestError(400, "Dapur belum ditetapkan.")
+        order = next((o for o in state.orders if o["id"] == body.get("id")), None)
+        if order is None:
+            raise RequestError(404, "Pesanan tidak ditemukan.")
+        points = controller.order_points(order)
+        distance_matrix, time_matrix = await self.compute_matrices(controller, points)
+        loop = asyncio.get_running_loop()
+        (route, total_distance, segments), solve_time = await loop.run_in_executor(
+            self.pool, timed_call, models.find_shortest_route, distance_matrix, 1, 0, time_matrix)
+        metrics.observe("solve.order", solve_time)
+        if route is None:
+            raise RequestError(500, "Gagal menghitung rute.")
+        controller.store_route(order["id"], (points, route, total_distance, segments), solve_time)
+        return route_payload(points, route, total_distance, segments)
+
+    async def route_multi_drop(self, body):
+        controller = self.tenant(body.get("tenant", "default"))
+        state = controller.snapshot()
+        if not state.depots:
+            raise RequestError(400, "Dapur belum ditetapkan.")
+        points = state.depots[:1] + state.points
+        if len(points) < 2:
+            raise RequestError(400, "Tambahkan setidaknya satu pesanan.")
+        distance_matrix, time_matrix = await self.compute_matrices(controller, points)
+        loop = asyncio.get_running_loop()
+        solve = functools.partial(timed_call, models.find_multi_drop_route, points, distance_matrix,
+                                  max_stops=len(points), time_matrix=time_matrix)
+        (route, total_distance, segments, mst_edges), solve_time = await loop.run_in_executor(self.pool, solve)
+        metrics.observe("solve.multi_drop", solve_time)
+        if route is None:
+            raise RequestError(500, "Gagal menghitung rute.")
+        controller.store_route("multi_drop", (points, route, total_distance, segments, mst_edges), solve_time)
+        payload = route_payload(points, route, total_distance, segments)
+        payload["mst_edges"] = [[int(u), int(v), float(w)] for u, v, w in mst_edges]
+        return payload
+
+    def handler_for(self, path):
+        return {
+            "/geocode": self.geocode,
+            "/depot": self.set_depot,
+            "/orders": self.add_order,
+            "/route/order": self.route_order,
+            "/route/multi-drop": self.route_multi_drop,
+        }.get(path)
+
+    async def dispatch(self, method, path, body):
+        """Menjalankan handler dengan backpressure (503 jika antrean penuh) dan batas waktu (504).
+
+        Slot antrean baru dilepas saat handler benar-benar selesai, bukan saat 504 dikirim:
+        pekerjaan di process pool tidak bisa dihentikan, jadi tetap dihitung dalam batas.
+        """
+        handler = self.handler_for(path)
+        if handler is None:
+            raise RequestError(404, f"Endpoint tidak dikenal: {path}")
+        if method != "POST":
+            raise RequestError(405, "Gunakan metode POST.")
+        if self.pending.locked():
+            raise RequestError(503, "Server sedang sibuk, coba lagi nanti.")
+        await self.pending.acquire()
+        task = asyncio.ensure_future(handler(body))
+        task.add_done_callback(self._finish_task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            raise RequestError(504, "Permintaan melebihi batas waktu.")
+
+    def _finish_task(self, task):
+        self.pending.release()
+        if not task.cancelled():
+            task.exception()  # diambil agar error setelah 504 tidak dilaporkan sebagai "never retrieved"
+
+    async def handle_connection(self, reader, writer):
+        try:
+            status, payload = 200, None
+            try:
+                method, path, body = await asyncio.wait_for(read_request(reader), self.timeout)
+                payload = await self.dispatch(method, path, body)
+            except RequestError as e:
+                status, payload = e.status, {"error": str(e)}
+            except Exception as e:
+                logging.error(f"Error server: {str(e)}")
+                status, payload = 500, {"error": str(e)}
+            data = json.dumps(payload, default=float).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                f"Connection: close\r\n\r\n".encode("ascii") + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+def validate_order(body):
+    """Memeriksa field pesanan dari body; mengembalikan nilai sesuai urutan ORDER_FIELDS."""
+    values = [body.get(f) for f in ORDER_FIELDS]
+    for field, value in zip(ORDER_FIELDS, values):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float, type(None))):
+            raise RequestError(400, f"Field '{field}' harus berupa teks.")
+    missing = [f for f, v in zip(ORDER_FIELDS[1:], values[1:]) if v is None or not str(v).strip()]
+    if missing:
+        raise RequestError(400, f"Field wajib belum diisi: {', '.join(missing)}.")
+    try:
+        price = float(values[-1])
+    except ValueError:
+        raise RequestError(400, "Harga harus angka.")
+    if not math.isfinite(price) or price < 0:
+        raise RequestError(400, "Harga harus angka dan tidak negatif.")
+    return values[:-1] + [price]
+
+def route_payload(points, route, total_distance, segments):
+    segment_distances, segment_times = segments
+    return {
+        "route": [points[i]["name"] for i in route],
+        "route_indices": [int(i) for i in route],
+        "distance_km": float(total_distance),
+        "time_min": float(sum(segment_times)),
+        "segments": [{"distance_km": float(d), "time_min": float(t)}
+                     for d, t in zip(segment_distances, segment_times)],
+    }
+
+async def read_request(reader):
+    """Membaca satu permintaan HTTP/1.1 sederhana dan mengembalikan (metode, path, body JSON)."""
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        raise RequestError(400, "Permintaan kosong.")
+    try:
+        method, path, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise RequestError(400, "Baris permintaan tidak valid.")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, "Body terlalu besar.")
+    raw = await reader.readexactly(length) if length else b""
+    try:
+        body = json.loads(raw) if raw else {}
+    except json.JSONDecodeError:
+        raise RequestError(400, "Body harus JSON.")
+    if not isinstance(body, dict):
+        raise RequestError(400, "Body harus objek JSON.")
+    return method.upper(), path.split("?", 1)[0], body
+
+async def serve(host, port, **kwargs):
+    service = RoutingService(**kwargs)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    logging.info(f"Layanan rute berjalan di http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.pool.shutdown(cancel_futures=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan HTTP rute pengiriman.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses solver (default: jumlah core)")
+    parser.add_argument("--max-pending", type=int, default=32, help="Batas permintaan yang diproses bersamaan")
+    parser.add_argument("--timeout", type=float, default=30, help="Batas waktu per permintaan (detik)")
+    parser.add_argument("--output", default="tenants", help="Folder data per tenant")
+    parser.add_argument("--point-set", help="Nama matriks titik tersimpan (lihat delivery_batch --point-set)")
+    parser.add_argument("--max-tenants", type=int, default=MAX_TENANTS, help="Batas jumlah tenant")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, output_dir=args.output, workers=args.workers,
+                      max_pending=args.max_pending, timeout=args.timeout, point_set=args.point_set,
+                      max_tenants=args.max_tenants))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import heapq
+import math
+
+# Titik acuan proyeksi (pusat kota Cirebon); error proyeksi equirectangular
+# di wilayah sekecil CIREBON_BOUNDS jauh di bawah 1%.
+ORIGIN = (-6.7320, 108.5523)
+KM_PER_DEG_LAT = 111.32
+KM_PER_DEG_LON = 111.32 * math.cos(math.radians(ORIGIN[0]))
+DEFAULT_CELL_KM = 0.5
+
+def project(coords):
+    """Mengubah (lat, lon) menjadi koordinat bidang (x, y) dalam km."""
+    lat, lon = coords
+    return (lon - ORIGIN[1]) * KM_PER_DEG_LON, (lat - ORIGIN[0]) * KM_PER_DEG_LAT
+
+class SpatialIndex:
+    """Indeks grid seragam untuk query k titik terdekat dan radius pada koordinat terproyeksi."""
+    def __init__(self, cell_km=DEFAULT_CELL_KM):
+        self.cell_km = cell_km
+        self.cells = {}
+        self.items = {}
+        self.bbox = None  # (min_cx, min_cy, max_cx, max_cy) sel yang pernah terisi
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_km)), int(math.floor(y / self.cell_km))
+
+    def add(self, key, coords):
+        """Menambahkan (atau memindahkan) item `key` di koordinat `coords`."""
+        if key in self.items:
+            self.remove(key)
+        x, y = project(coords)
+        cell = self._cell(x, y)
+        self.items[key] = (x, y, cell, tuple(coords))
+        self.cells.setdefault(cell, set()).add(key)
+        if self.bbox is None:
+            self.bbox = cell + cell
+        else:
+            self.bbox = (min(self.bbox[0], cell[0]), min(self.bbox[1], cell[1]),
+                         max(self.bbox[2], cell[0]), max(self.bbox[3], cell[1]))
+
+    def remove(self, key):
+        x, y, cell, _ = self.items.pop(key)
+        self.cells[cell].discard(key)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.items.clear()
+        self.bbox = None
+
+    def coords(self, key):
+        return self.items[key][3]
+
+    def _ring(self, cx, cy, r):
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def nearest(self, coords, k=1, max_km=None, exclude=()):
+        """Mengembalikan daftar (jarak_km, key) untuk k item terdekat, urut dari yang terdekat."""
+        if not self.items:
+            return []
+        x, y = project(coords)
+        cx, cy = self._cell(x, y)
+        heap = []  # max-heap (jarak negatif) berisi k kandidat terbaik
+        max_ring = max(cx - self.bbox[0], self.bbox[2] - cx, cy - self.bbox[1], self.bbox[3] - cy)
+        r = 0
+        while True:
+            for cell in self._ring(cx, cy, r):
+                for key in self.cells.get(cell, ()):
+                    if key in exclude:
+                        continue
+                    ix, iy = self.items[key][:2]
+                    d = math.hypot(ix - x, iy - y)
+                    if max_km is not None and d > max_km:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d, key))
+                    elif d < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d, key))
+            # Sel pada ring berikutnya berjarak minimal r * cell_km dari titik query.
+            reach = r * self.cell_km
+            if len(heap) == k and -heap[0][0] <= reach:
+                break
+            if max_km is not None and reach > max_km:
+                break
+            if r >= max_ring:
+                break
+            r += 1
+        return sorted((-d, key) for d, key in heap)
+
+    def within(self, coords, radius_km):
+        """Mengembalikan daftar (jarak_km, key) untuk semua item dalam radius, urut dari terdekat."""
+        x, y = project(coords)
+        x0, y0 = self._cell(x - radius_km, y - radius_km)
+        x1, y1 = self._cell(x + radius_km, y + radius_km)
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    ix, iy = self.items[key][:2]
+                    d = math.hypot(ix - x, iy - y)
+                    if d <= radius_km:
+                        found.append((d, key))
+        return sorted(found)
+
+def candidate_edges(points, k=8, cell_km=DEFAULT_CELL_KM):
+    """Pasangan indeks (i, j), i < j, yang menghubungkan setiap titik ke k tetangga terdekatnya.
+
+    Dipakai untuk membatasi sisi yang diperiksa algoritma Kruskal pada kumpulan titik besar.
+    """
+    index = SpatialIndex(cell_km)
+    for i, p in enumerate(points):
+        index.add(i, p["coords"])
+    edges = set()
+    for i, p in enumerate(points):
+        for _, j in index.nearest(p["coords"], k, exclude=(i,)):
+            edges.add((min(i, j), max(i, j)))
+    return edges
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+# Kecepatan rata-rata per jam (km/jam), indeks 0-23. Jam sibuk pagi, makan siang,
+# dan sore lebih lambat daripada AVERAGE_SPEED = 30.
+DEFAULT_HOURLY_SPEEDS = [
+    35, 35, 35, 35, 35, 32,   # 00-05
+    28, 20, 22, 27, 26, 20,   # 06-11
+    17, 19, 25, 24, 20, 18,   # 12-17
+    21, 25, 28, 30, 32, 34,   # 18-23
+]
+# Faktor pengali kecepatan per zona; pusat kota lebih padat daripada pinggiran.
+DEFAULT_ZONE_FACTORS = {"pusat": 0.8, "pinggiran": 1.1}
+CITY_CENTER = (-6.7320, 108.5523)
+CENTER_RADIUS_KM = 3.0
+SPEED_PROFILE_FILE = "speed_profile.json"
+TIME_MATRIX_CACHE_SIZE = 128
+# Kecepatan acuan waktu tempuh graf jalan (sama dengan AVERAGE_SPEED di delivery_models).
+REFERENCE_SPEED = 30
+
+class SpeedProfile:
+    """Tabel kecepatan per jam (dan per zona) untuk menghitung matriks waktu tempuh."""
+    def __init__(self, hourly_speeds=None, zone_factors=None, bucket_hours=1):
+        hourly = np.asarray(hourly_speeds or DEFAULT_HOURLY_SPEEDS, dtype=np.float64)
+        if hourly.shape != (24,) or (hourly <= 0).any():
+            raise ValueError("Profil kecepatan harus berisi 24 nilai positif.")
+        self.zone_names = list((zone_factors or DEFAULT_ZONE_FACTORS).keys())
+        factors = np.asarray([(zone_factors or DEFAULT_ZONE_FACTORS)[z] for z in self.zone_names])
+        # table[jam, zona] = kecepatan km/jam
+        self.table = hourly[:, None] * factors[None, :]
+        self.bucket_hours = bucket_hours
+        # Identitas isi profil untuk kunci cache matriks waktu (sesi dan memori).
+        self.fingerprint = hashlib.sha1(
+            self.table.tobytes() + repr((self.zone_names, bucket_hours)).encode()).hexdigest()[:12]
+        self._cache = OrderedDict()
+
+    @classmethod
+    def load(cls, path=SPEED_PROFILE_FILE):
+        """Memuat profil dari file JSON; memakai profil bawaan jika file tidak ada."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            return cls(data.get("hourly_speeds"), data.get("zone_factors"), data.get("bucket_hours", 1))
+        except FileNotFoundError:
+            return cls()
+        except Exception as e:
+            logging.error(f"Gagal memuat profil kecepatan {path}: {str(e)}")
+            return cls()
+
+    def bucket(self, hour=None):
+        """Mengubah jam (0-23, default jam sekarang) menjadi jam awal bucket waktu."""
+        if hour is None:
+            hour = datetime.now().hour
+        return (int(hour) % 24) // self.bucket_hours * self.bucket_hours
+
+    def zones_for(self, coords):
+        """Menentukan indeks zona untuk setiap koordinat (vektor)."""
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        dlat = (coords[:, 0] - CITY_CENTER[0]) * 111.32
+        dlon = (coords[:, 1] - CITY_CENTER[1]) * 111.32 * np.cos(np.radians(CITY_CENTER[0]))
+        in_center = np.hypot(dlat, dlon) <= CENTER_RADIUS_KM
+        center_idx = self.zone_names.index("pusat") if "pusat" in self.zone_names else 0
+        other_idx = self.zone_names.index("pinggiran") if "pinggiran" in self.zone_names else 0
+        return np.where(in_center, center_idx, other_idx)
+
+    def speed_matrix(self, points, hour=None):
+        """Kecepatan per ruas (km/jam): rata-rata kecepatan zona asal dan tujuan."""
+        speeds = self.table[self.bucket(hour)][self.zones_for([p["coords"] for p in points])]
+        return (speeds[:, None] + speeds[None, :]) / 2
+
+    def time_matrix(self, points, distance_matrix, hour=None, base_time=None):
+        """Matriks waktu tempuh (menit), di-cache per bucket waktu dan kumpulan titik.
+
+        Jika `base_time` (waktu dari graf jalan) diberikan, waktu itu diskalakan dengan
+        REFERENCE_SPEED / kecepatan profil; jika tidak, waktu = jarak / kecepatan profil.
+        """
+        key = (self.bucket(hour), tuple(tuple(p["coords"]) for p in points), base_time is not None)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        if base_time is not None:
+            matrix = np.asarray(base_time, dtype=np.float64) * (REFERENCE_SPEED / self.speed_matrix(points, hour))
+        else:
+            matrix = np.asarray(distance_matrix, dtype=np.float64) / self.speed_matrix(points, hour) * 60
+        matrix.setflags(write=False)
+        self._cache[key] = matrix
+        if len(self._cache) > TIME_MATRIX_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return matrix
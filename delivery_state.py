@@ -0,0 +1,158 @@
+import json
+import logging
+import sqlite3
+import threading
+
+SESSION_FILE = "session.db"
+SCHEMA_VERSION = 1
+# Jumlah matriks yang disimpan di sesi; yang paling lama tidak ditulis ulang dihapus.
+MATRIX_ROWS = 256
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS depots (idx INTEGER PRIMARY KEY, name TEXT, lat REAL, lon REAL);
+CREATE TABLE IF NOT EXISTS points (idx INTEGER PRIMARY KEY, name TEXT, lat REAL, lon REAL);
+CREATE TABLE IF NOT EXISTS orders (id TEXT PRIMARY KEY, position INTEGER, data TEXT);
+CREATE TABLE IF NOT EXISTS order_depots (id TEXT PRIMARY KEY, depot INTEGER);
+CREATE TABLE IF NOT EXISTS routes (key TEXT PRIMARY KEY, data TEXT);
+CREATE TABLE IF NOT EXISTS matrices (key TEXT PRIMARY KEY, size INTEGER, distance BLOB, time BLOB);
+"""
+
+def _coords(value):
+    return tuple(value) if value is not None else None
+
+def _encode_route(value, solve_time=None):
+    points, route, total_distance, (segment_distances, segment_times), *rest = value
+    return json.dumps({
+        "points": [{"name": p["name"], "coords": list(p["coords"])} for p in points],
+        "route": [int(i) for i in route],
+        "total_distance": float(total_distance),
+        "segment_distances": [float(d) for d in segment_distances],
+        "segment_times": [float(t) for t in segment_times],
+        "mst_edges": [[int(u), int(v), float(w)] for u, v, w in rest[0]] if rest else None,
+        "solve_time": solve_time,
+    })
+
+def _decode_route(data):
+    """Mengembalikan (nilai rute, waktu hitung detik atau None)."""
+    data = json.loads(data)
+    points = [{"name": p["name"], "coords": _coords(p["coords"])} for p in data["points"]]
+    value = (points, data["route"], data["total_distance"],
+             (data["segment_distances"], data["segment_times"]))
+    if data["mst_edges"] is not None:
+        value += ([tuple(e) for e in data["mst_edges"]],)
+    return value, data.get("solve_time")
+
+def matrix_key(points):
+    """Kunci matriks berdasarkan koordinat titik secara berurutan."""
+    return ";".join(f"{p['coords'][0]:.6f},{p['coords'][1]:.6f}" for p in points)
+
+class SessionStore:
+    """Snapshot state DeliveryController di SQLite, disimpan bertahap setiap ada perubahan."""
+    def __init__(self, path=SESSION_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # Satu koneksi dipakai bersama oleh thread UI, worker, dan server; transaksi diserialkan.
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None:
+            with self.conn:
+                self.conn.execute("INSERT INTO meta VALUES ('version', ?)", (str(SCHEMA_VERSION),))
+        elif int(row[0]) != SCHEMA_VERSION:
+            raise ValueError(f"Versi sesi tidak didukung: {row[0]}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def save_depots(self, depots, start=0):
+        """Menyimpan dapur mulai indeks `start` (dapur utama berindeks 0)."""
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO depots VALUES (?, ?, ?, ?)",
+                                  [(i, d["name"], *d["coords"]) for i, d in enumerate(depots[start:], start)])
+            self.conn.execute("DELETE FROM depots WHERE idx >= ?", (len(depots),))
+
+    def save_points(self, points, start=0):
+        """Menyimpan titik mulai indeks `start` dan menghapus titik yang sudah tidak ada."""
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?)",
+                                  [(i, p["name"], *p["coords"]) for i, p in enumerate(points[start:], start)])
+            self.conn.execute("DELETE FROM points WHERE idx >= ?", (len(points),))
+
+    def save_orders(self, orders, positions):
+        """Menyimpan pesanan (dict) beserta posisinya dalam daftar pesanan."""
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO orders VALUES (?, ?, ?)",
+                                  [(o["id"], pos, json.dumps(o)) for o, pos in zip(orders, positions)])
+
+    def save_order_depots(self, order_depots):
+        """Mengganti seluruh penugasan pesanan -> indeks dapur."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM order_depots")
+            self.conn.executemany("INSERT INTO order_depots VALUES (?, ?)", list(order_depots.items()))
+
+    def save_route(self, key, value, solve_time=None):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO routes VALUES (?, ?)",
+                              (key, _encode_route(value, solve_time)))
+
+    def delete_routes(self, keys):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM routes WHERE key = ?", [(key,) for key in keys])
+
+    def save_matrix(self, key, distance_matrix, time_matrix):
+        import numpy as np
+        distance = np.ascontiguousarray(distance_matrix, dtype=np.float64)
+        time = np.ascontiguousarray(time_matrix, dtype=np.float64)
+        with self.lock, self.conn:
+            # INSERT OR REPLACE memberi rowid baru, jadi rowid terkecil = paling lama ditulis.
+            self.conn.execute("INSERT OR REPLACE INTO matrices VALUES (?, ?, ?, ?)",
+                              (key, len(distance), distance.tobytes(), time.tobytes()))
+            self.conn.execute("DELETE FROM matrices WHERE rowid NOT IN "
+                              "(SELECT rowid FROM matrices ORDER BY rowid DESC LIMIT ?)", (MATRIX_ROWS,))
+
+    def load_matrix(self, key):
+        """Membaca satu matriks (jarak, waktu) tersimpan, atau None jika tidak ada."""
+        with self.lock:
+            row = self.conn.execute("SELECT size, distance, time FROM matrices WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        import numpy as np
+        size, distance, time = row
+        return (np.frombuffer(distance, dtype=np.float64).reshape(size, size),
+                np.frombuffer(time, dtype=np.float64).reshape(size, size))
+
+    def load(self):
+        """Membaca state tersimpan sebagai dict; matriks dibaca per kunci lewat load_matrix."""
+        with self.lock:
+            return self._load()
+
+    def _load(self):
+        depots = [{"name": name, "coords": (lat, lon)}
+                  for name, lat, lon in self.conn.execute("SELECT name, lat, lon FROM depots ORDER BY idx")]
+        points = [{"name": name, "coords": (lat, lon)}
+                  for name, lat, lon in self.conn.execute("SELECT name, lat, lon FROM points ORDER BY idx")]
+        orders = []
+        for (data,) in self.conn.execute("SELECT data FROM orders ORDER BY position"):
+            order = json.loads(data)
+            order["customer_coords"] = _coords(order["customer_coords"])
+            order["destination_coords"] = _coords(order["destination_coords"])
+            orders.append(order)
+        order_depots = dict(self.conn.execute("SELECT id, depot FROM order_depots"))
+        routes = {}
+        solve_times = {}
+        for key, data in self.conn.execute("SELECT key, data FROM routes"):
+            routes[key], solve_time = _decode_route(data)
+            if solve_time is not None:
+                solve_times[key] = solve_time
+        logging.info(f"Sesi dimuat dari {self.path}: {len(points)} titik, {len(orders)} pesanan, {len(routes)} rute")
+        return {
+            "depots": depots,
+            "points": points,
+            "orders": orders,
+            "order_depots": order_depots,
+            "routes": routes,
+            "solve_times": solve_times,
+        }
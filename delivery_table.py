@@ -0,0 +1,106 @@
+from itertools import islice
+
+PAGE_SIZE = 200
+SUMMARY_ITEMS = 5
+SUMMARY_CHARS = 80
+
+def summarize(values, total=None, limit=SUMMARY_ITEMS, max_chars=SUMMARY_CHARS):
+    """Menggabungkan paling banyak `limit` nilai pertama dengan "; " lalu memotongnya.
+
+    Hanya `limit` nilai yang dibaca dari iterable, jadi biayanya tidak bergantung pada
+    jumlah pesanan. `total` (jumlah seluruh nilai) dipakai untuk menulis sisa item.
+    """
+    head = [str(v) for v in islice(values, limit)]
+    text = "; ".join(head)
+    if len(text) > max_chars:
+        text = text[:max_chars - 3].rstrip() + "..."
+    if total is not None and total > len(head):
+        text += f" (+{total - len(head)} lainnya)"
+    return text
+
+class PagedTable:
+    """Model baris untuk ttk.Treeview yang hanya menyisipkan baris pada halaman aktif.
+
+    Baris disimpan sebagai key -> values; `set_rows` membandingkan dengan isi sebelumnya
+    dan hanya memperbarui item Treeview yang terlihat dan berubah.
+    """
+    def __init__(self, tree, page_size=PAGE_SIZE, on_page_change=None):
+        self.tree = tree
+        self.page_size = page_size
+        self.on_page_change = on_page_change
+        self.keys = []
+        self.rows = {}
+        self.page = 0
+        self.visible = []  # key yang sedang ada di Treeview, berurutan
+        self.rendered = {}  # key -> (values, tag) yang terakhir dikirim ke Treeview
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.keys) // self.page_size))
+
+    def values(self, key):
+        return self.rows.get(key)
+
+    def set_rows(self, rows):
+        """Mengganti seluruh isi tabel dengan daftar (key, values)."""
+        self.keys = [key for key, _ in rows]
+        self.rows = dict(rows)
+        self.page = min(self.page, self.page_count - 1)
+        self.render()
+
+    def upsert(self, key, values):
+        """Menambah atau memperbarui satu baris."""
+        if key not in self.rows:
+            self.keys.append(key)
+        elif self.rows[key] == values:
+            return
+        self.rows[key] = values
+        self.render()
+
+    def remove(self, key):
+        if key in self.rows:
+            self.keys.remove(key)
+            del self.rows[key]
+            self.page = min(self.page, self.page_count - 1)
+            self.render()
+
+    def go_to(self, page):
+        page = max(0, min(page, self.page_count - 1))
+        if page != self.page:
+            self.page = page
+            self.render()
+
+    def next_page(self):
+        self.go_to(self.page + 1)
+
+    def prev_page(self):
+        self.go_to(self.page - 1)
+
+    def render(self):
+        """Menyelaraskan Treeview dengan baris pada halaman aktif (diff per item)."""
+        start = self.page * self.page_size
+        wanted = self.keys[start:start + self.page_size]
+        wanted_set = set(wanted)
+        stale = [key for key in self.visible if key not in wanted_set]
+        if stale:
+            self.tree.delete(*stale)
+            for key in stale:
+                del self.rendered[key]
+        kept = [key for key in self.visible if key in wanted_set]
+        reorder = kept != [key for key in wanted if key in self.rendered]
+        for position, key in enumerate(wanted):
+            state = (self.rows[key], "evenrow" if (start + position) % 2 == 0 else "oddrow")
+            if key not in self.rendered:
+                self.tree.insert("", position, iid=key, values=state[0], tags=(state[1],))
+            else:
+                if self.rendered[key] != state:
+                    self.tree.item(key, values=state[0], tags=(state[1],))
+                if reorder:
+                    self.tree.move(key, "", position)
+            self.rendered[key] = state
+        self.visible = wanted
+        if self.on_page_change:
+            self.on_page_change(self.page, self.page_count, len(self.keys))
@@ -1,22 +1,45 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from tkinterweb.htmlwidgets import HtmlFrame
+from tkinter import ttk, messagebox, filedialog
 from delivery_controller import DeliveryController
+from delivery_analytics import format_summary
+from delivery_table import PagedTable, summarize
+import importlib
 import os
 import logging
+import queue
+import threading
+import time
 import webbrowser
-from PIL import Image, ImageTk
 
-logging.basicConfig(level=logging.DEBUG, filename="delivery.log", filemode="w",
+logging.basicConfig(level=logging.DEBUG, filename="delivery.log", filemode="a",
                     format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Modul berat yang dimuat di thread latar setelah jendela tampil, agar
+# perhitungan rute/peta pertama tidak menunggu import.
+WARMUP_MODULES = [
+    "numpy", "geopy.geocoders", "geopy.distance", "ortools.constraint_solver.pywrapcp",
+    "folium", "folium.plugins", "tkinterweb.htmlwidgets",
+]
+# Selama solver berjalan, peta rute sementara digambar ulang paling sering tiap sekian detik.
+ANYTIME_MAP_INTERVAL = 2.0
+MAP_PLACEHOLDER = "<p style='color:#333333;font-family:Segoe UI;'>Klik dua kali pada baris pesanan untuk melihat peta rute.</p>"
+
 class DeliveryUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Rute Pengiriman Makanan - Cirebon")
         self.root.geometry("1200x900")
         self.controller = DeliveryController()
+        success, message = self.controller.open_session()
+        logging.info(message)
         self.editing_order_id = None
+        self.solve_thread = None
+        self.last_map_time = 0
+        self.depot_routes = {}
+        # Tampilan rute gabungan yang sedang dihitung: sertakan baris pesanan dan teks total
+        # (None = total rute gabungan), diisi start_multi_drop_solve.
+        self.solve_include_orders = False
+        self.solve_total_text = None
         self.progress_counter = 0
         self.progress_max = 0
         
@@ -64,7 +87,42 @@ class DeliveryUI:
         self.setup_main_page()
         self.setup_depot_page()
         self.setup_order_page()
+        self.refresh_table()
         self.show_page("main")
+        self.root.after(100, self.warm_up)
+
+    def warm_up(self):
+        """Memuat modul berat di thread latar, lalu membuat panel peta di thread UI."""
+        def import_modules():
+            for name in WARMUP_MODULES:
+                try:
+                    importlib.import_module(name)
+                except Exception as e:
+                    logging.warning(f"Gagal memuat modul {name}: {str(e)}")
+            logging.info("Modul berat selesai dimuat.")
+
+        thread = threading.Thread(target=import_modules, daemon=True)
+        thread.start()
+
+        def finish():
+            if thread.is_alive():
+                self.root.after(100, finish)
+            elif self._map_frame is None:
+                self.create_map_frame()
+
+        self.root.after(100, finish)
+
+    def create_map_frame(self):
+        from tkinterweb.htmlwidgets import HtmlFrame
+        self._map_frame = HtmlFrame(self.map_parent, messages_enabled=False)
+        self._map_frame.grid(row=4, column=0, sticky="nsew", padx=5, pady=2)
+        self._map_frame.load_html(MAP_PLACEHOLDER)
+        return self._map_frame
+
+    @property
+    def map_frame(self):
+        """Panel peta (tkinterweb) yang dibuat saat pertama kali dibutuhkan."""
+        return self._map_frame or self.create_map_frame()
 
     def setup_background(self):
         self.root.configure(bg="#E8F5E9") 
@@ -217,6 +275,13 @@ class DeliveryUI:
         )
         depot_button.grid(row=1, column=5, padx=5)
         
+        add_depot_button = ttk.Button(
+            depot_frame,
+            text="Tambah Dapur Lain",
+            command=self.add_depot
+        )
+        add_depot_button.grid(row=3, column=5, padx=5, pady=10)
+        
         back_button = ttk.Button(
             depot_frame,
             text="Kembali" if not self.icons["back"] else "Kembali",
@@ -298,6 +363,7 @@ class DeliveryUI:
         button_frame.columnconfigure(0, weight=1)
         button_frame.columnconfigure(1, weight=1)
         button_frame.columnconfigure(2, weight=1)
+        button_frame.columnconfigure(3, weight=1)
         
         route_button = ttk.Button(
             button_frame,
@@ -326,6 +392,24 @@ class DeliveryUI:
         )
         export_button.grid(row=0, column=2, padx=5, pady=2, sticky="w")
         
+        import_button = ttk.Button(
+            button_frame,
+            text="Impor Pesanan" if not self.icons["order"] else "Impor Pesanan",
+            image=self.icons["order"],
+            compound="left",
+            command=self.import_orders
+        )
+        import_button.grid(row=0, column=3, padx=5, pady=2, sticky="w")
+        
+        self.cancel_button = ttk.Button(button_frame, text="Hentikan", command=self.cancel_solve)
+        self.cancel_button.grid(row=0, column=4, padx=5, pady=2)
+        self.cancel_button.state(["disabled"])
+        
+        ttk.Button(button_frame, text="<", width=3, command=lambda: self.table.prev_page()).grid(row=0, column=5, padx=2, pady=2)
+        self.page_label = ttk.Label(button_frame, text="Halaman 1/1", background="#E3F2FD")
+        self.page_label.grid(row=0, column=6, padx=2, pady=2)
+        ttk.Button(button_frame, text=">", width=3, command=lambda: self.table.next_page()).grid(row=0, column=7, padx=2, pady=2)
+        
         self.tree = ttk.Treeview(
             main_frame,
             columns=("ID", "Kurir", "Pelanggan", "Tujuan", "Pesanan", "Harga", "Jarak", "Waktu", "Peta"),
@@ -354,15 +438,17 @@ class DeliveryUI:
         
         self.tree.tag_configure("evenrow", background="#F5F5F5")
         self.tree.tag_configure("oddrow", background="#FFFFFF")
+        self.table = PagedTable(self.tree, on_page_change=self.update_page_label)
+        self.map_files = {}
+        self.route_rows = []
         
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.tree.yview)
         scrollbar.grid(row=3, column=1, sticky="ns", pady=2)
         self.tree.configure(yscrollcommand=scrollbar.set)
         
-        self.map_frame = HtmlFrame(main_frame, messages_enabled=False)
-        self.map_frame.grid(row=4, column=0, sticky="nsew", padx=5, pady=2)
+        self.map_parent = main_frame
+        self._map_frame = None
         main_frame.rowconfigure(4, weight=1)
-        self.map_frame.load_html("<p style='color:#333333;font-family:Segoe UI;'>Klik dua kali pada baris pesanan untuk melihat peta rute.</p>")
         
         self.total_label = ttk.Label(
             main_frame,
@@ -406,6 +492,22 @@ class DeliveryUI:
             self.show_page("order")
         self.depot_progress["value"] = 0
 
+    def add_depot(self):
+        name = self.depot_name_entry.get()
+        address = self.depot_address_entry.get()
+        self.progress_counter = 0
+        self.progress_max = 1
+        self.depot_progress["maximum"] = 100
+        self.depot_progress["value"] = 0
+        
+        success, message = self.controller.add_depot(name, address, self.update_progress)
+        messagebox.showinfo("Sukses", message) if success else messagebox.showerror("Error", message)
+        self.status_label.config(text=message)
+        if success:
+            self.depot_name_entry.delete(0, tk.END)
+            self.depot_address_entry.delete(0, tk.END)
+        self.depot_progress["value"] = 0
+
     def save_order(self):
         courier = self.courier_entry.get()
         customer = self.customer_entry.get()
@@ -433,8 +535,68 @@ class DeliveryUI:
         if success:
             self.clear_order_form()
             self.editing_order_id = None
+            self.refresh_table()
         self.order_progress["value"] = 0
 
+    def import_orders(self):
+        path = filedialog.askopenfilename(
+            filetypes=[("CSV/JSON", "*.csv *.json *.jsonl"), ("Semua file", "*.*")]
+        )
+        if not path:
+            return
+        self.status_label.config(text="Mengimpor pesanan...")
+        self.root.update()
+        success, message, errors = self.controller.import_orders(path)
+        if success:
+            self.refresh_table()
+        if success and not errors:
+            messagebox.showinfo("Sukses", message)
+        elif success:
+            messagebox.showwarning("Sebagian Diimpor", message)
+        else:
+            messagebox.showerror("Error", message)
+        self.status_label.config(text=message.splitlines()[0])
+
+    def update_page_label(self, page, page_count, total):
+        self.page_label.config(text=f"Halaman {page + 1}/{page_count} ({total} baris)")
+
+    def order_row(self, order):
+        """Nilai baris tabel untuk satu pesanan; Jarak/Waktu kosong jika rutenya belum dihitung."""
+        route = self.controller.routes.get(order["id"])
+        distance = time = ""
+        if route:
+            distance = f"{route[2]:.2f}"
+            time = f"{sum(route[3][1]):.2f}"
+        return (
+            order["id"][:8],
+            order["courier"],
+            order["customer"],
+            order["destination"],
+            order["order"],
+            f"{order['price']:,.0f}",
+            distance,
+            time,
+            self.map_files.get(order["id"], "")
+        )
+
+    def multi_drop_row(self, label, orders, total_distance, total_time, map_filename):
+        return (
+            label,
+            orders[0]["courier"] if orders else "N/A",
+            "Semua",
+            "Semua",
+            summarize((o["order"] for o in orders), len(orders)),
+            f"{sum(o['price'] for o in orders):,.0f}",
+            f"{total_distance:.2f}",
+            f"{total_time:.2f}",
+            map_filename
+        )
+
+    def refresh_table(self, include_orders=True):
+        """Menyelaraskan tabel dengan pesanan dan baris rute gabungan terakhir (hanya baris terlihat yang digambar ulang)."""
+        rows = [(order["id"], self.order_row(order)) for order in self.controller.orders] if include_orders else []
+        self.table.set_rows(rows + self.route_rows)
+
     def clear_order_form(self):
         self.courier_entry.delete(0, tk.END)
         self.customer_entry.delete(0, tk.END)
@@ -444,14 +606,25 @@ class DeliveryUI:
         self.order_entry.delete(0, tk.END)
         self.price_entry.delete(0, tk.END)
 
+    def solving(self):
+        if self.solve_thread and self.solve_thread.is_alive():
+            self.status_label.config(text="Perhitungan rute gabungan masih berjalan.")
+            return True
+        return False
+
+    def cancel_solve(self):
+        success, message = self.controller.cancel_solve()
+        self.status_label.config(text=message)
+
     def display_routes(self):
-        self.tree.delete(*self.tree.get_children())
-        self.map_frame.load_html("<p style='color:#333333;font-family:Segoe UI;'>Klik dua kali pada baris pesanan untuk melihat peta rute.</p>")
+        if self.solving():
+            return
+        self.map_frame.load_html(MAP_PLACEHOLDER)
         total_distance = 0
         total_time = 0
         total_price = 0
         
-        for i, order in enumerate(self.controller.orders):
+        for order in self.controller.orders:
             points, route, results, error = self.controller.calculate_route_for_order(order)
             if error:
                 messagebox.showerror("Error", f"Pesanan {order['id'][:8]}: {error}")
@@ -459,71 +632,187 @@ class DeliveryUI:
                 continue
             
             total_distance_order, segment_distances, segment_times = results
-            map_filename = self.controller.generate_map_for_order(order, points, route, segment_distances, segment_times)
-            
-            tag = "evenrow" if i % 2 == 0 else "oddrow"
-            self.tree.insert("", "end", values=(
-                order["id"][:8],
-                order["courier"],
-                order["customer"],
-                order["destination"],
-                order["order"],
-                f"{order['price']:,.0f}",
-                f"{total_distance_order:.2f}",
-                f"{sum(segment_times):.2f}",
-                map_filename
-            ), tags=(tag,))
+            self.map_files[order["id"]] = self.controller.generate_map_for_order(order, points, route, segment_distances, segment_times)
             
             total_distance += total_distance_order
             total_time += sum(segment_times)
             total_price += order["price"]
         
-        points, route, results, mst_edges, error = self.controller.calculate_multi_drop_route()
-        if not error:
-            total_distance_multi, segment_distances, segment_times = results
-            map_filename = self.controller.generate_map_for_multi_drop(points, route, segment_distances, segment_times, mst_edges)
-            self.tree.insert("", "end", values=(
-                "Multi-Drop",
-                self.controller.orders[0]["courier"] if self.controller.orders else "N/A",
-                "Semua",
-                "Semua",
-                "; ".join(o["order"] for o in self.controller.orders),
-                f"{total_price:,.0f}",
-                f"{total_distance_multi:.2f}",
-                f"{sum(segment_times):.2f}",
-                map_filename
-            ), tags=("oddrow",))
-        
-        self.total_label.config(text=f"Total: Jarak = {total_distance:.2f} km, Waktu = {total_time:.2f} menit, Harga = Rp {total_price:,.0f}")
-        self.status_label.config(text="Rute berhasil dihitung." if self.controller.orders else "Tidak ada pesanan.")
+        self.route_rows = []
+        self.refresh_table()
+        total_text = f"Total: Jarak = {total_distance:.2f} km, Waktu = {total_time:.2f} menit, Harga = Rp {total_price:,.0f}"
+        self.show_route_analytics(total_text)
+        if not self.controller.orders:
+            self.status_label.config(text="Tidak ada pesanan.")
+            return
+        # Rute gabungan dihitung di thread latar seperti display_multi_drop_route.
+        self.start_multi_drop_solve(include_orders=True, total_text=total_text)
+
+    def show_route_analytics(self, total_text):
+        summary = format_summary(self.controller.route_analytics()["summary"])
+        self.total_label.config(text=f"{total_text}\n{summary}" if summary else total_text)
 
     def display_multi_drop_route(self):
-        self.tree.delete(*self.tree.get_children())
+        if self.solving():
+            return
         self.map_frame.load_html("<p style='color:#333333;font-family:Segoe UI;'>Klik dua kali pada baris untuk melihat peta rute gabungan.</p>")
-        
-        points, route, results, mst_edges, error = self.controller.calculate_multi_drop_route()
+        if len(self.controller.depots) > 1:
+            self.display_multi_depot_routes()
+            return
+        self.start_multi_drop_solve()
+
+    def start_multi_drop_solve(self, include_orders=False, total_text=None):
+        """Menjalankan solver rute gabungan di thread latar (bisa dihentikan dengan tombol Hentikan).
+
+        Rute yang membaik dikirim lewat antrean dan ditampilkan oleh poll_multi_drop_route
+        di thread UI. `include_orders` mempertahankan baris pesanan di tabel; `total_text`
+        menggantikan teks total rute gabungan pada hasil akhir.
+        """
+        self.solve_include_orders = include_orders
+        self.solve_total_text = total_text
+        updates = queue.Queue()
+
+        def solve():
+            result = self.controller.calculate_multi_drop_route(lambda *best: updates.put(("progress", best)))
+            updates.put(("done", result))
+
+        self.solve_thread = threading.Thread(target=solve, daemon=True)
+        self.solve_thread.start()
+        self.last_map_time = 0
+        self.cancel_button.state(["!disabled"])
+        self.status_label.config(text="Menghitung rute gabungan...")
+        self.root.after(100, lambda: self.poll_multi_drop_route(updates))
+
+    def poll_multi_drop_route(self, updates):
+        latest = result = None
+        while True:
+            try:
+                kind, value = updates.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest = value
+            else:
+                result = value
+        if result is not None:
+            self.finish_multi_drop_route(result)
+            return
+        if latest is not None:
+            self.show_multi_drop_route(*latest, final=False)
+        self.root.after(100, lambda: self.poll_multi_drop_route(updates))
+
+    def finish_multi_drop_route(self, result):
+        self.cancel_button.state(["disabled"])
+        points, route, results, mst_edges, error = result
         if error:
             messagebox.showerror("Error", error)
             self.status_label.config(text=error)
             return
-        
         total_distance, segment_distances, segment_times = results
-        map_filename = self.controller.generate_map_for_multi_drop(points, route, segment_distances, segment_times, mst_edges)
+        self.show_multi_drop_route(points, route, total_distance, (segment_distances, segment_times), mst_edges, final=True)
+
+    def show_multi_drop_route(self, points, route, total_distance, segments, mst_edges, final):
+        """Menampilkan rute gabungan (sementara atau akhir) di tabel dan peta."""
+        segment_distances, segment_times = segments
+        map_filename = self.controller.output_path("delivery_map_multi_drop.html")
+        if final or time.monotonic() - self.last_map_time >= ANYTIME_MAP_INTERVAL:
+            map_filename = self.controller.generate_map_for_multi_drop(points, route, segment_distances, segment_times, mst_edges)
+            self.last_map_time = time.monotonic()
+            try:
+                self.map_frame.load_file(map_filename)
+            except Exception as e:
+                logging.error(f"Gagal memuat peta di aplikasi: {str(e)}")
         
         total_price = sum(order["price"] for order in self.controller.orders)
-        self.tree.insert("", "end", values=(
-            "Multi-Drop",
-            self.controller.orders[0]["courier"] if self.controller.orders else "N/A",
-            "Semua",
-            "Semua",
-            "; ".join(o["order"] for o in self.controller.orders),
-            f"{total_price:,.0f}",
-            f"{total_distance:.2f}",
-            f"{sum(segment_times):.2f}",
-            map_filename
-        ), tags=("oddrow",))
-        
-        self.status_label.config(text="Rute gabungan berhasil dihitung.")
+        self.route_rows = [("multi_drop", self.multi_drop_row(
+            "Multi-Drop", self.controller.orders, total_distance, sum(segment_times), map_filename))]
+        self.refresh_table(include_orders=self.solve_include_orders)
+        
+        total_text = f"Total: Jarak = {total_distance:.2f} km, Waktu = {sum(segment_times):.2f} menit, Harga = Rp {total_price:,.0f}"
+        if final:
+            self.show_route_analytics(self.solve_total_text or total_text)
+            self.status_label.config(text="Rute gabungan berhasil dihitung.")
+        else:
+            if self.solve_total_text is None:
+                self.total_label.config(text=total_text)
+            self.status_label.config(text=f"Rute sementara: {total_distance:.2f} km, masih mencari rute lebih baik...")
+
+    def display_multi_depot_routes(self):
+        """Menjalankan solver semua dapur di thread latar seperti start_multi_drop_solve.
+
+        Rute terbaik per dapur ditampilkan selama pencarian; tombol Hentikan menghentikan
+        semua solver dan memakai rute terbaik sejauh ini.
+        """
+        updates = queue.Queue()
+
+        def solve():
+            result = self.controller.calculate_multi_depot_routes(
+                on_progress=lambda best: updates.put(("progress", best)))
+            updates.put(("done", result))
+
+        self.solve_thread = threading.Thread(target=solve, daemon=True)
+        self.solve_thread.start()
+        self.depot_routes = {}
+        self.last_map_time = 0
+        self.cancel_button.state(["!disabled"])
+        self.status_label.config(text=f"Menghitung rute {len(self.controller.depots)} dapur...")
+        self.root.after(100, lambda: self.poll_multi_depot_routes(updates))
+
+    def poll_multi_depot_routes(self, updates):
+        changed = False
+        result = None
+        while True:
+            try:
+                kind, value = updates.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.depot_routes[value["depot_idx"]] = value
+                changed = True
+            else:
+                result = value
+        if result is not None:
+            self.finish_multi_depot_routes(result)
+            return
+        if changed:
+            self.show_multi_depot_routes(
+                [self.depot_routes[d] for d in sorted(self.depot_routes)], final=False)
+        self.root.after(100, lambda: self.poll_multi_depot_routes(updates))
+
+    def finish_multi_depot_routes(self, result):
+        self.cancel_button.state(["disabled"])
+        results, error = result
+        if error:
+            messagebox.showerror("Error", error)
+            self.status_label.config(text=error)
+            return
+        self.show_multi_depot_routes(results, final=True)
+
+    def show_multi_depot_routes(self, results, final):
+        """Menampilkan rute per dapur (sementara atau akhir) di tabel dan peta."""
+        map_filename = self.controller.output_path("delivery_map_multi_depot.html")
+        if final or time.monotonic() - self.last_map_time >= ANYTIME_MAP_INTERVAL:
+            map_filename = self.controller.generate_map_for_multi_depot(results)
+            self.last_map_time = time.monotonic()
+            try:
+                self.map_frame.load_file(map_filename)
+            except Exception as e:
+                logging.error(f"Gagal memuat peta di aplikasi: {str(e)}")
+        self.route_rows = [
+            (f"multi_drop:{result['depot_idx']}", self.multi_drop_row(
+                f"Multi-Drop {result['points'][0]['name']}", result["orders"],
+                result["total_distance"], sum(result["segments"][1]), map_filename))
+            for result in results
+        ]
+        self.refresh_table(include_orders=False)
+        
+        if final:
+            self.show_route_analytics(f"Total: Harga = Rp {sum(o['price'] for o in self.controller.orders):,.0f}")
+            self.status_label.config(text=f"Rute {len(results)} dapur berhasil dihitung.")
+        else:
+            total_distance = sum(result["total_distance"] for result in results)
+            self.status_label.config(
+                text=f"Rute sementara {len(results)} dapur: {total_distance:.2f} km, masih mencari rute lebih baik...")
 
     def display_all_points_map(self):
         filename, error = self.controller.generate_all_points_map()
@@ -545,11 +834,12 @@ class DeliveryUI:
         selection = self.tree.selection()
         if not selection:
             return
-        item = self.tree.item(selection[0])
-        order_id = item["values"][0]
+        key = selection[0]
+        values = self.table.values(key)
+        order_id = values[0]
         
         for order in self.controller.orders:
-            if order["id"][:8] == order_id:
+            if order["id"] == key:
                 self.clear_order_form()
                 self.courier_entry.insert(0, order["courier"])
                 self.customer_entry.insert(0, order["customer"])
@@ -562,7 +852,9 @@ class DeliveryUI:
                 self.status_label.config(text=f"Mengedit pesanan: {order_id}")
                 break
         
-        map_filename = item["values"][8]
+        map_filename = values[8]
+        if not map_filename:
+            return
         if os.path.exists(map_filename):
             try:
                 self.map_frame.load_file(map_filename)
@@ -577,8 +869,18 @@ class DeliveryUI:
             self.status_label.config(text="File peta tidak ditemukan.")
 
     def export_to_csv(self):
-        message = self.controller.export_to_csv()
-        messagebox.showinfo("Sukses", message)
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            initialfile="orders.csv",
+            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet"), ("Arrow", "*.arrow")]
+        )
+        if not path:
+            return
+        success, message = self.controller.export_to_csv(path)
+        if success:
+            messagebox.showinfo("Sukses", message)
+        else:
+            messagebox.showerror("Error", message)
         self.status_label.config(text=message)
 
 if __name__ == "__main__":